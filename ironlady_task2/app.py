@@ -1,39 +1,139 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from models import Database, Student, Course, Enrollment
+from flask import Flask, Response, abort, render_template, request, redirect, url_for, flash, jsonify, session, make_response
+from models import Database, Student, Course, Enrollment, SummaryCache, Search, HIGHLIGHT_START, HIGHLIGHT_END
+from markupsafe import Markup, escape
 from summarizer import OllamaSummarizer
+from jobs import JobQueue, QueueFull, TokenFeed
+from course_index import CourseVectorIndex
+from response_cache import ResponseCache
+from profiler import RequestProfiler
+from bulk_import import BulkImporter, detect_format, FORMATS as IMPORT_FORMATS, KINDS as IMPORT_KINDS
+import hashlib
+import io
+import json
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
 import os
+import threading
+import time
+
+# Emit the summarizer's timing logs (time to first token); LOG_LEVEL=WARNING silences them
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(name)s %(levelname)s: %(message)s')
 
 app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-this'
+app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 
 # Initialize database and models
-db = Database()
+db = Database(os.environ.get('DATABASE_PATH', 'course_management.db'))
 student_model = Student(db)
 course_model = Course(db)
 enrollment_model = Enrollment(db)
-summarizer = OllamaSummarizer()
+summarizer = OllamaSummarizer(base_url=os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434'),
+                              model=os.environ.get('OLLAMA_MODEL', 'codellama:latest'))
+summary_cache = SummaryCache(db)
+search_model = Search(db)
+# Semantic search needs numpy, faiss and HF_TOKEN; otherwise the routes report 503
+course_index = CourseVectorIndex(db)
+# Size these to what the Ollama host can generate concurrently
+ai_jobs = JobQueue(workers=int(os.environ.get('AI_JOB_WORKERS', 2)),
+                   max_queued=int(os.environ.get('AI_JOB_QUEUE_SIZE', 100)))
+bulk_importer = BulkImporter(db)
+response_cache = ResponseCache(max_entries=int(os.environ.get('RESPONSE_CACHE_ENTRIES', 256)))
+# Per-request SQL, template and Ollama timing; costs nothing unless PROFILE_REQUESTS=1
+profiler = None
+if os.environ.get('PROFILE_REQUESTS') == '1':
+    profiler = RequestProfiler(explain=os.environ.get('PROFILE_EXPLAIN') == '1')
+    profiler.init_app(app, db, summarizer.session, ai_jobs)
+
+def cached_view(*tables):
+    """Conditional GET and response caching for a view that only reads tables.
+    
+    The ETag is derived from the URL and the data versions of the tables the
+    view reads, so any write to them changes it. Matching If-None-Match or
+    If-Modified-Since requests get 304, and unchanged pages are served
+    from the LRU cache without touching the view. Only 200 responses are
+    cached. Requests with pending flash messages bypass the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            
+            versions, last_updated = db.get_versions(tables)
+            key = request.full_path
+            etag = hashlib.sha1(f"{key}|{sorted(versions.items())}".encode('utf-8')).hexdigest()
+            
+            cached = response_cache.get(key, etag)
+            if cached is not None:
+                response = Response(cached[0], mimetype=cached[1])
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.set(key, etag, response.get_data(), response.mimetype)
+            
+            response.set_etag(etag)
+            response.last_modified = datetime.fromtimestamp(last_updated, tz=timezone.utc)
+            response.cache_control.no_cache = True  # always revalidate
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
 
 @app.route('/')
+@cached_view('students', 'courses')
 def index():
     """Dashboard showing overview"""
-    students = student_model.get_all()
-    courses = course_model.get_all()
     return render_template('index.html', 
-                         student_count=len(students), 
-                         course_count=len(courses))
+                         student_count=student_model.count(), 
+                         course_count=course_model.count())
 
 @app.route('/students')
+@cached_view('students')
 def students():
     """List all students"""
     all_students = student_model.get_all()
     return render_template('students.html', students=all_students)
 
 @app.route('/courses')
+@cached_view('courses')
 def courses():
     """List all courses"""
     all_courses = course_model.get_all()
     return render_template('courses.html', courses=all_courses)
 
+SEARCH_PAGE_SIZE = 20
+
+@app.template_filter('highlight')
+def highlight_filter(text):
+    """Escape a search snippet and turn its match markers into <mark> tags"""
+    escaped = str(escape(text or ''))
+    return Markup(escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+@app.route('/search')
+@cached_view('students', 'courses')
+def search():
+    """Full-text search over courses and students"""
+    query = request.args.get('q', '').strip()
+    scope = request.args.get('type', 'all')
+    page = max(request.args.get('page', 1, type=int), 1)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    
+    course_total, course_results = 0, []
+    student_total, student_results = 0, []
+    if query:
+        if scope in ('all', 'courses'):
+            course_total, course_results = search_model.courses(query, SEARCH_PAGE_SIZE, offset)
+        if scope in ('all', 'students'):
+            student_total, student_results = search_model.students(query, SEARCH_PAGE_SIZE, offset)
+    
+    has_next = offset + SEARCH_PAGE_SIZE < max(course_total, student_total)
+    return render_template('search.html', query=query, scope=scope, page=page, has_next=has_next,
+                           course_total=course_total, courses=course_results,
+                           student_total=student_total, students=student_results)
+
 @app.route('/add_student', methods=['GET', 'POST'])
 def add_student():
     """Add new student"""
@@ -61,20 +161,65 @@ def add_course():
         duration_hours = int(request.form['duration_hours'])
         difficulty_level = request.form['difficulty_level']
         
-        course_model.create(title, description, content, instructor, duration_hours, difficulty_level)
+        course_id = course_model.create(title, description, content, instructor, duration_hours, difficulty_level)
+        course_index.schedule_sync([course_id])
         flash('Course added successfully!', 'success')
         return redirect(url_for('courses'))
     
     return render_template('add_course.html')
 
+@app.route('/import', methods=['GET', 'POST'])
+def import_data():
+    """Bulk import students, courses or enrollments from CSV/JSONL"""
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash('Error: Choose what to import and a file to upload!', 'error')
+            return redirect(url_for('import_data'))
+        
+        fmt = request.form.get('format') or detect_format(upload.filename)
+        if fmt not in IMPORT_FORMATS:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+            flash(f'Error: Unsupported format {fmt!r}, use csv or jsonl!', 'error')
+            return redirect(url_for('import_data'))
+        
+        # utf-8-sig drops the byte order mark Excel writes at the start of CSV files
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = bulk_importer.import_stream(kind, stream, fmt)
+        if kind == 'courses' and report['inserted']:
+            course_index.schedule_sync(new=True)
+        
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(report), 400 if report.get('error') else 200
+        
+        if report.get('error'):
+            flash(f"Error: {report['error']}", 'error')
+        flash(f"Imported {kind}: {report['inserted']} inserted, {report['skipped']} skipped, "
+              f"{report['rejected']} rejected ({report['rows_per_second']} rows/s)",
+              'error' if report['rejected'] else 'success')
+        for error in report['errors'][:5]:
+            flash(f"Line {error['line']}: {error['error']}", 'error')
+        return redirect(url_for('import_data'))
+    
+    return render_template('import_data.html', kinds=IMPORT_KINDS)
+
 @app.route('/course/<int:course_id>')
+@cached_view('courses', 'students', 'enrollments')
 def course_detail(course_id):
     """View course details"""
-    course = course_model.get_by_id(course_id)
+    course = course_model.get_with_content(course_id)
+    if not course:
+        flash('Course not found!', 'error')
+        return redirect(url_for('courses'))
+    
     enrolled_students = enrollment_model.get_course_students(course_id)
     return render_template('course_detail.html', course=course, students=enrolled_students)
 
 @app.route('/student/<int:student_id>')
+@cached_view('students', 'courses', 'enrollments')
 def student_detail(student_id):
     """View student details"""
     student = student_model.get_by_id(student_id)
@@ -84,11 +229,8 @@ def student_detail(student_id):
     
     enrolled_courses = enrollment_model.get_student_courses(student_id)
     
-    # Get all courses for enrollment modal
-    all_courses = course_model.get_all()
-    # Filter out already enrolled courses
-    enrolled_course_ids = [course['id'] for course in enrolled_courses]
-    available_courses = [course for course in all_courses if course['id'] not in enrolled_course_ids]
+    # Courses not yet enrolled in, for the enrollment modal
+    available_courses = enrollment_model.get_available_courses(student_id)
     
     return render_template('student_detail.html', 
                          student=student, 
@@ -96,37 +238,289 @@ def student_detail(student_id):
                          available_courses=available_courses)
 
 
+def _summary_key(course_id, content):
+    return (course_id, 'summary', summarizer.model, summarizer.SUMMARY_PROMPT_VERSION,
+            SummaryCache.input_hash(content))
+
+def _outline_key(course):
+    return (course['id'], 'outline', summarizer.model, summarizer.OUTLINE_PROMPT_VERSION,
+            SummaryCache.input_hash(course['title'], course['description']))
+
+def _partials_key(course_id):
+    return (course_id, 'section', summarizer.model, summarizer.SECTION_PROMPT_VERSION)
+
+@contextmanager
+def cached_partials(course_id):
+    """Cached section summaries for a course; new or pruned ones are saved on exit"""
+    partials = summary_cache.get_partials(*_partials_key(course_id))
+    before = dict(partials)
+    try:
+        yield partials
+    finally:
+        if partials != before:
+            summary_cache.set_partials(*_partials_key(course_id), partials)
+
+def course_summary(course_id, content):
+    """Return (summary, cached), generating and storing it on a cache miss"""
+    key = _summary_key(course_id, content)
+    summary = summary_cache.get(*key)
+    if summary is not None:
+        return summary, True
+    
+    with cached_partials(course_id) as partials:
+        summary = summarizer.summarize_long_content(content, partials=partials)
+    if not summarizer.is_error(summary):
+        summary_cache.set(*key, summary)
+    return summary, False
+
+def course_outline(course):
+    """Return (outline, cached), generating and storing it on a cache miss"""
+    key = _outline_key(course)
+    outline = summary_cache.get(*key)
+    if outline is not None:
+        return outline, True
+    
+    outline = summarizer.generate_course_outline(course['title'], course['description'])
+    if not summarizer.is_error(outline):
+        summary_cache.set(*key, outline)
+    return outline, False
+
+def _missing_ai_results():
+    """(key, job fn, args) for every summary and outline not yet cached"""
+    for course in course_model.get_all():
+        content = course_model.get_content(course['id'])
+        if content:
+            key = _summary_key(course['id'], content)
+            if summary_cache.get(*key) is None:
+                yield key, _summary_job, (course['id'], content)
+        key = _outline_key(course)
+        if summary_cache.get(*key) is None:
+            yield key, _outline_job, (dict(course),)
+
+def warm_summary_cache(poll_interval=0.5):
+    """Generate any missing summaries and outlines for every course.
+    
+    Work goes through ai_jobs, so it shares the worker limit and in-flight
+    jobs with user requests. At most one warm-up job per worker is queued
+    at a time, leaving the rest of the queue for users.
+    """
+    pending = []
+    for key, fn, args in _missing_ai_results():
+        while True:
+            pending = [job for job in pending if job.finished_at is None]
+            if len(pending) < ai_jobs.workers:
+                try:
+                    pending.append(ai_jobs.submit(key, fn, *args))
+                    break
+                except QueueFull:
+                    pass
+            time.sleep(poll_interval)
+
+def start_cache_warmup():
+    thread = threading.Thread(target=warm_summary_cache, name='summary-cache-warmup', daemon=True)
+    thread.start()
+    return thread
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_tasks():
+    """Sync the course index and optionally warm the AI cache, once per process"""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    course_index.schedule_sync()
+    if os.environ.get('WARM_SUMMARY_CACHE') == '1':
+        start_cache_warmup()
+
+@app.before_request
+def _start_background_tasks():
+    # Not done at import: the debug reloader also imports this module in its
+    # file-watcher process, which would sync and warm up a second time
+    if not _background_started:
+        start_background_tasks()
+
+def _summary_job(course_id, content):
+    return {'summary': course_summary(course_id, content)[0]}
+
+def _outline_job(course):
+    return {'outline': course_outline(course)[0]}
+
+def _job_response(key, fn, *args):
+    """202 with a job id to poll; requests for the same key share one job"""
+    try:
+        job = ai_jobs.submit(key, fn, *args)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    if isinstance(job.fn, TokenFeed):
+        job.fn.keep = True  # joined a stream's job; finish it even if the stream disconnects
+    data = job.to_dict()
+    data['status_url'] = url_for('job_status', job_id=job.id)
+    return jsonify(data), 202
+
 @app.route('/summarize_course/<int:course_id>')
+@cached_view('courses', 'ai_results')
 def summarize_course(course_id):
-    """Generate course content summary using Ollama"""
+    """Return a cached course summary, or start a background job to generate one"""
     try:
         course = course_model.get_by_id(course_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        if not course['content']:
+        content = course_model.get_content(course_id)
+        if not content:
             return jsonify({'error': 'No content to summarize'}), 400
-            
-        summary = summarizer.summarize_content(course['content'])
-        return jsonify({'summary': summary})
+        
+        key = _summary_key(course_id, content)
+        summary = summary_cache.get(*key)
+        if summary is not None:
+            return jsonify({'summary': summary, 'cached': True})
+        
+        return _job_response(key, _summary_job, course_id, content)
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 @app.route('/generate_outline/<int:course_id>')
+@cached_view('courses', 'ai_results')
 def generate_outline(course_id):
-    """Generate course outline using Ollama"""
+    """Return a cached course outline, or start a background job to generate one"""
     try:
         course = course_model.get_by_id(course_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
-            
-        outline = summarizer.generate_course_outline(course['title'], course['description'])
-        return jsonify({'outline': outline})
+        
+        key = _outline_key(course)
+        outline = summary_cache.get(*key)
+        if outline is not None:
+            return jsonify({'outline': outline, 'cached': True})
+        
+        return _job_response(key, _outline_job, dict(course))
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(key, tokens, field):
+    """Stream a generation job's tokens as Server-Sent Events.
+    
+    Generation runs on ai_jobs, so streams share its worker limit, and a
+    second stream or poll for the same key joins the job in flight. The
+    full text is cached when the job finishes. If every client disconnects
+    first, the job stops and closes the upstream Ollama request.
+    """
+    def finish(text):
+        text = text.strip()
+        if text:
+            summary_cache.set(*key, text)
+        return {field: text}
+    
+    def events():
+        cached = summary_cache.get(*key)
+        if cached is not None:
+            yield _sse('token', {'token': cached})
+            yield _sse('done', {'cached': True})
+            return
+        
+        try:
+            job = ai_jobs.submit(key, TokenFeed(tokens, finish))
+        except QueueFull as e:
+            yield _sse('error', {'error': str(e)})
+            return
+        
+        if not isinstance(job.fn, TokenFeed):
+            # Joined a job started by a polling client: send its result in one piece
+            job.wait()
+            if job.status == 'failed':
+                yield _sse('error', {'error': job.error})
+            else:
+                yield _sse('token', {'token': job.result[field]})
+                yield _sse('done', {'cached': False})
+            return
+        
+        reader = job.fn.read()
+        try:
+            for token in reader:
+                yield _sse('token', {'token': token})
+        finally:
+            reader.close()
+        if job.fn.error:
+            yield _sse('error', {'error': job.fn.error})
+            return
+        yield _sse('done', {'cached': False})
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/summarize_course/<int:course_id>/stream')
+def summarize_course_stream(course_id):
+    """Stream a course summary as Server-Sent Events"""
+    course = course_model.get_by_id(course_id)
+    if not course:
+        return jsonify({'error': 'Course not found'}), 404
+    
+    content = course_model.get_content(course_id)
+    if not content:
+        return jsonify({'error': 'No content to summarize'}), 400
+    
+    def tokens():
+        with cached_partials(course_id) as partials:
+            yield from summarizer.stream_summary(content, partials=partials)
+    
+    return _sse_response(_summary_key(course_id, content), tokens, 'summary')
+
+@app.route('/generate_outline/<int:course_id>/stream')
+def generate_outline_stream(course_id):
+    """Stream a course outline as Server-Sent Events"""
+    course = course_model.get_by_id(course_id)
+    if not course:
+        return jsonify({'error': 'Course not found'}), 404
+    
+    return _sse_response(_outline_key(course),
+                         lambda: summarizer.stream_course_outline(course['title'], course['description']),
+                         'outline')
+
+def _scored_courses(matches):
+    """Attach metadata to [(course_id, score)] from the vector index"""
+    scores = dict(matches)
+    return [{'id': course['id'], 'title': course['title'], 'instructor': course['instructor'],
+             'difficulty_level': course['difficulty_level'], 'score': round(scores[course['id']], 4)}
+            for course in course_model.get_many([course_id for course_id, _ in matches])]
+
+@app.route('/similar_courses/<int:course_id>')
+def similar_courses(course_id):
+    """Courses semantically closest to this one"""
+    if not course_index.ready:
+        return jsonify({'error': 'Semantic index is not available yet'}), 503
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    return jsonify({'course_id': course_id, 'courses': _scored_courses(course_index.similar(course_id, k))})
+
+@app.route('/recommended_courses/<int:student_id>')
+def recommended_courses(student_id):
+    """Courses closest to what the student is enrolled in (dropped courses ignored)"""
+    if not course_index.ready:
+        return jsonify({'error': 'Semantic index is not available yet'}), 503
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    enrolled = enrollment_model.get_student_courses(student_id)
+    profile = [course['id'] for course in enrolled if course['completion_status'] != 'Dropped']
+    matches = course_index.recommend(profile, k + len(enrolled))
+    # Never recommend a course the student is already enrolled in, even if dropped
+    enrolled_ids = {course['id'] for course in enrolled}
+    matches = [match for match in matches if match[0] not in enrolled_ids][:k]
+    return jsonify({'student_id': student_id, 'courses': _scored_courses(matches)})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a background generation job"""
+    job = ai_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job.to_dict())
+
 
 @app.route('/enroll', methods=['POST'])
 def enroll_student():
@@ -170,6 +564,40 @@ def enroll_student():
     return redirect(url_for('student_detail', student_id=student_id))
 
 
+def _batch_pairs(data):
+    """Expand a batch request into (student_id, course_id) pairs.
+    
+    Accepts one course with many students, one student with many courses,
+    or an explicit list of pairs.
+    """
+    if 'pairs' in data:
+        return [(pair[0], pair[1]) for pair in data['pairs']]
+    if 'course_id' in data:
+        return [(student_id, data['course_id']) for student_id in data.get('student_ids', [])]
+    if 'student_id' in data:
+        return [(data['student_id'], course_id) for course_id in data.get('course_ids', [])]
+    raise ValueError('Provide course_id with student_ids, student_id with course_ids, or pairs')
+
+@app.route('/enroll_batch', methods=['POST'])
+def enroll_batch():
+    """Enroll many students in a course (or a student in many courses) at once"""
+    try:
+        pairs = _batch_pairs(request.get_json(force=True) or {})
+        return jsonify(enrollment_model.enroll_batch(pairs))
+    except (ValueError, TypeError, IndexError, KeyError) as e:
+        return jsonify({'error': f'Invalid request: {str(e)}'}), 400
+
+@app.route('/enrollment_status_batch', methods=['POST'])
+def enrollment_status_batch():
+    """Update completion_status for many enrollments at once"""
+    try:
+        data = request.get_json(force=True) or {}
+        pairs = _batch_pairs(data)
+        return jsonify(enrollment_model.update_status_batch(pairs, data.get('completion_status')))
+    except (ValueError, TypeError, IndexError, KeyError) as e:
+        return jsonify({'error': f'Invalid request: {str(e)}'}), 400
+
+
 @app.route('/delete_student/<int:student_id>', methods=['POST'])
 def delete_student(student_id):
     """Delete student"""
@@ -181,8 +609,26 @@ def delete_student(student_id):
 def delete_course(course_id):
     """Delete course"""
     course_model.delete(course_id)
+    course_index.remove(course_id)
     flash('Course deleted successfully!', 'success')
     return redirect(url_for('courses'))
 
+@app.route('/debug/profiler', methods=['GET', 'POST'])
+def profiler_report():
+    """Slowest requests and SQL statements seen by the request profiler"""
+    if profiler is None:
+        abort(404)
+    if request.method == 'POST':
+        profiler.reset()
+        return redirect(url_for('profiler_report'))
+    
+    report = profiler.report()
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report)
+    return render_template('profiler.html', **report)
+
 if __name__ == '__main__':
+    # With the reloader on, only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_tasks()
     app.run(debug=True)
@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from models import Database, Search
+from seed_data import LAST_NAMES, TOPICS, WORDS, phrase, seed
+
+
+def time_queries(fn, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FTS5 search latency on a seeded database')
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--courses', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        seed(db, args.students, args.courses)
+        search = Search(db)
+
+        cases = {
+            'course, 1 term': [rng.choice(WORDS) for _ in range(args.queries)],
+            'course, 2 terms': [phrase(rng, 2) for _ in range(args.queries)],
+            'course, prefix': [rng.choice(WORDS)[:3] for _ in range(args.queries)],
+            'course, page 10': [rng.choice(WORDS) for _ in range(args.queries)],
+            'course, topic': [rng.choice(TOPICS) for _ in range(args.queries)],
+            'student, name': [rng.choice(LAST_NAMES) for _ in range(args.queries)],
+            'student, email': [f'user{rng.randrange(args.students)}' for _ in range(args.queries)],
+        }
+        runners = {
+            'course, page 10': lambda q: search.courses(q, 20, 180),
+            'student, name': lambda q: search.students(q),
+            'student, email': lambda q: search.students(q),
+        }
+        for name, queries in cases.items():
+            fn = runners.get(name, lambda q: search.courses(q))
+            p50, p95 = time_queries(fn, queries)
+            print(f'{name:<16} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
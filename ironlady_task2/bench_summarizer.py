@@ -0,0 +1,57 @@
+import argparse
+import statistics
+import time
+
+import requests
+
+from stub_ollama import start_stub_server
+from summarizer import OllamaSummarizer
+
+
+def legacy_summarize(base_url, model, content):
+    """Previous request pattern: health check plus generate, no shared session"""
+    if requests.get(f"{base_url}/api/tags", timeout=120).status_code != 200:
+        return None
+    payload = {"model": model, "prompt": content, "stream": False}
+    return requests.post(f"{base_url}/api/generate", json=payload, timeout=60).json()['response']
+
+
+def measure(fn, requests_count):
+    timings = []
+    for _ in range(requests_count):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def describe(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<10} mean {statistics.mean(timings):7.3f} ms   p50 {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-request latency of OllamaSummarizer against a stub Ollama server')
+    parser.add_argument('-n', '--requests', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.0, help='Simulated generation time in seconds')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(generate_delay=args.delay)
+    summarizer = OllamaSummarizer(base_url=base_url)
+    content = 'Course content. ' * 100
+
+    # Warm both paths once so neither pays for imports or first connection setup
+    legacy_summarize(base_url, summarizer.model, content)
+    summarizer.summarize_content(content)
+
+    legacy = describe('legacy', measure(lambda: legacy_summarize(base_url, summarizer.model, content), args.requests))
+    pooled = describe('pooled', measure(lambda: summarizer.summarize_content(content), args.requests))
+    print(f"saved      {legacy - pooled:7.3f} ms per request ({(legacy - pooled) / legacy:.0%})")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
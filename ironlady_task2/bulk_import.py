@@ -0,0 +1,259 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from models import Database, DIFFICULTY_LEVELS, COMPLETION_STATUSES
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+
+KINDS = ('students', 'courses', 'enrollments')
+FORMATS = ('csv', 'jsonl')
+
+# Course content can run to megabytes; the csv module's default limit is 128 KiB
+csv.field_size_limit(1024 ** 3)
+
+STUDENT_SQL = 'INSERT OR IGNORE INTO students (name, email, phone) VALUES (?, ?, ?)'
+COURSE_SQL = 'INSERT INTO courses (id, title, description, instructor, duration_hours, difficulty_level) VALUES (?, ?, ?, ?, ?, ?)'
+COURSE_CONTENT_SQL = 'INSERT INTO course_contents (course_id, content, compressed) VALUES (?, ?, ?)'
+# Enrollments are resolved against existing rows so unknown ids are skipped
+ENROLLMENT_BY_ID_SQL = '''
+    INSERT OR IGNORE INTO enrollments (student_id, course_id, completion_status)
+    SELECT s.id, c.id, ? FROM students s, courses c WHERE s.id = ? AND c.id = ?
+'''
+ENROLLMENT_BY_EMAIL_SQL = '''
+    INSERT OR IGNORE INTO enrollments (student_id, course_id, completion_status)
+    SELECT s.id, c.id, ? FROM students s, courses c WHERE s.email = ? AND c.id = ?
+'''
+
+
+class RowError(ValueError):
+    pass
+
+
+def _text(row, field, required=False):
+    value = row.get(field)
+    if value is None:
+        value = ''
+    value = str(value).strip()
+    if required and not value:
+        raise RowError(f"missing '{field}'")
+    return value
+
+
+def _int(row, field):
+    value = _text(row, field, required=True)
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"'{field}' must be an integer, got {value!r}")
+
+
+def read_rows(stream, fmt):
+    """Yield (line_no, row_dict) from a CSV or JSONL text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, RowError(f'invalid JSON: {e.msg}')
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError('expected a JSON object')
+                continue
+            yield line_no, row
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def detect_format(filename):
+    """Guess csv/jsonl from a file name"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+class BulkImporter:
+    def __init__(self, db, batch_size=DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    def import_stream(self, kind, stream, fmt):
+        """Validate and insert rows in batches, returning a report dict"""
+        if kind not in KINDS:
+            raise ValueError(f'Unknown import kind: {kind}')
+
+        validate = getattr(self, f'_validate_{kind[:-1]}')
+        flush = getattr(self, f'_flush_{kind}')
+
+        report = {'kind': kind, 'inserted': 0, 'skipped': 0, 'rejected': 0, 'errors': []}
+        started = time.perf_counter()
+
+        conn = self.db.get_connection()
+        try:
+            batch = []
+            try:
+                for line_no, row in read_rows(stream, fmt):
+                    try:
+                        if isinstance(row, RowError):
+                            raise row
+                        batch.append(validate(row))
+                    except RowError as e:
+                        report['rejected'] += 1
+                        if len(report['errors']) < MAX_REPORTED_ERRORS:
+                            report['errors'].append({'line': line_no, 'error': str(e)})
+                        continue
+
+                    if len(batch) >= self.batch_size:
+                        self._run_batch(conn, flush, batch, report)
+                        batch = []
+            except UnicodeDecodeError:
+                # Rows read before the bad bytes are still imported
+                report['error'] = 'File is not UTF-8 encoded text; the import stopped at the first invalid byte'
+            except csv.Error as e:
+                report['error'] = f'Malformed CSV, the import stopped there: {e}'
+
+            if batch:
+                self._run_batch(conn, flush, batch, report)
+        finally:
+            conn.close()
+
+        elapsed = time.perf_counter() - started
+        processed = report['inserted'] + report['skipped'] + report['rejected']
+        report['seconds'] = round(elapsed, 3)
+        report['rows_per_second'] = round(processed / elapsed) if elapsed > 0 else processed
+        return report
+
+    def _run_batch(self, conn, flush, batch, report):
+        """Insert one batch inside a single transaction"""
+        with conn:
+            inserted = flush(conn, batch)
+        report['inserted'] += inserted
+        report['skipped'] += len(batch) - inserted
+
+    # Validation: return a tuple ready for the batch, or raise RowError
+
+    def _validate_student(self, row):
+        name = _text(row, 'name', required=True)
+        email = _text(row, 'email', required=True)
+        if '@' not in email:
+            raise RowError(f'invalid email {email!r}')
+        return (name, email, _text(row, 'phone') or None)
+
+    def _validate_course(self, row):
+        difficulty = _text(row, 'difficulty_level', required=True).capitalize()
+        if difficulty not in DIFFICULTY_LEVELS:
+            raise RowError(f'invalid difficulty_level {difficulty!r}')
+        return (
+            _text(row, 'title', required=True),
+            _text(row, 'description'),
+            _text(row, 'content', required=True),
+            _text(row, 'instructor'),
+            _int(row, 'duration_hours'),
+            difficulty,
+        )
+
+    def _validate_enrollment(self, row):
+        status = _text(row, 'completion_status') or 'Enrolled'
+        if status not in COMPLETION_STATUSES:
+            raise RowError(f'invalid completion_status {status!r}')
+        course_id = _int(row, 'course_id')
+        if _text(row, 'student_id'):
+            return (ENROLLMENT_BY_ID_SQL, (status, _int(row, 'student_id'), course_id))
+        email = _text(row, 'student_email', required=True)
+        return (ENROLLMENT_BY_EMAIL_SQL, (status, email, course_id))
+
+    # Flushing: executemany inside the open transaction, returning rows inserted.
+    # rowcount is used rather than total_changes, which also counts trigger writes.
+
+    def _flush_students(self, conn, batch):
+        return conn.executemany(STUDENT_SQL, batch).rowcount
+
+    def _flush_courses(self, conn, batch):
+        # Assign ids up front so content rows can be inserted with executemany too.
+        # Take the write lock first so a concurrent Course.create cannot claim them.
+        conn.execute('BEGIN IMMEDIATE')
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'courses'").fetchone()
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM courses').fetchone()[0]
+        next_id = max(seq[0] if seq else 0, max_id) + 1
+
+        course_rows = []
+        content_rows = []
+        search_rows = []
+        for offset, (title, description, content, instructor, duration_hours, difficulty) in enumerate(batch):
+            course_id = next_id + offset
+            course_rows.append((course_id, title, description, instructor, duration_hours, difficulty))
+            value, compressed = self.db.encode_content(content)
+            content_rows.append((course_id, value, compressed))
+            if compressed:
+                search_rows.append((content, course_id))
+
+        conn.executemany(COURSE_SQL, course_rows)
+        conn.executemany(COURSE_CONTENT_SQL, content_rows)
+        if search_rows and self.db.search_enabled:
+            # Triggers only index uncompressed content
+            conn.executemany('UPDATE courses_fts SET content = ? WHERE rowid = ?', search_rows)
+        return len(batch)
+
+    def _flush_enrollments(self, conn, batch):
+        by_sql = {}
+        for sql, params in batch:
+            by_sql.setdefault(sql, []).append(params)
+        return sum(conn.executemany(sql, params).rowcount for sql, params in by_sql.items())
+
+
+def _benchmark_rows(kind, count):
+    """Synthetic JSONL rows for measuring throughput"""
+    for i in range(count):
+        if kind == 'students':
+            row = {'name': f'Student {i}', 'email': f'student{i}@example.com', 'phone': '555-0100'}
+        elif kind == 'courses':
+            row = {'title': f'Course {i}', 'description': 'Benchmark course', 'content': 'Lorem ipsum ' * 50,
+                   'instructor': 'Bench', 'duration_hours': 10, 'difficulty_level': DIFFICULTY_LEVELS[i % 3]}
+        else:
+            row = {'student_id': i + 1, 'course_id': 1}
+        yield json.dumps(row) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import students, courses or enrollments from CSV/JSONL')
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('path', nargs='?', help='CSV or JSONL file (use - for stdin)')
+    parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--db', default='course_management.db')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--compress', action='store_true', help='Compress course content')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='Import N synthetic rows instead of a file and report throughput')
+    args = parser.parse_args()
+
+    db = Database(args.db, compress_content=args.compress)
+    importer = BulkImporter(db, batch_size=args.batch_size)
+
+    if args.benchmark:
+        report = importer.import_stream(args.kind, _benchmark_rows(args.kind, args.benchmark), 'jsonl')
+    elif not args.path:
+        parser.error('path is required unless --benchmark is given')
+    elif args.path == '-':
+        report = importer.import_stream(args.kind, sys.stdin, args.format or 'csv')
+    else:
+        fmt = args.format or detect_format(args.path)
+        with open(args.path, newline='', encoding='utf-8-sig') as f:
+            report = importer.import_stream(args.kind, f, fmt)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
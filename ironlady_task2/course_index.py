@@ -0,0 +1,283 @@
+import hashlib
+import logging
+import os
+import threading
+
+# Semantic search is optional: without these the index stays disabled
+try:
+    import numpy as np
+    import faiss
+except ImportError:
+    np = faiss = None
+try:
+    from huggingface_hub import InferenceClient
+except ImportError:
+    InferenceClient = None
+
+logger = logging.getLogger(__name__)
+
+# Same embedding setup as the RAG index in ironlady_task1
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "BAAI/bge-small-en-v1.5")  # 384-dim
+# bge-small reads at most 512 tokens; longer text only costs upload time
+MAX_EMBED_CHARS = 2000
+
+
+def l2_normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True) + 1e-12
+    return x / norms
+
+
+class HFEmbedder:
+    """Batch text embedding through the Hugging Face Inference API (as in rag_build.embed_texts)"""
+    def __init__(self, token=None, model=EMBED_MODEL, batch_size=16):
+        self.client = InferenceClient(provider="hf-inference", api_key=token or os.environ["HF_TOKEN"])
+        self.model = model
+        self.batch_size = batch_size
+
+    def __call__(self, texts):
+        embs = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            vecs = self.client.feature_extraction(batch, model=self.model)
+            embs.append(np.array(vecs, dtype=np.float32))
+        return l2_normalize(np.vstack(embs))
+
+
+def course_text(title, description, content):
+    return f"{title}\n{description or ''}\n{content or ''}"[:MAX_EMBED_CHARS]
+
+
+class CourseVectorIndex:
+    """In-memory FAISS index of course embeddings.
+
+    Vectors are stored in the course_embeddings table, keyed by a hash of
+    the embedded text. At startup a full sync embeds new or changed courses
+    and builds the index from the stored vectors. After that, added or
+    imported courses are synced by id and patched into the live index with
+    add_with_ids/remove_ids. Queries never call the embedding API.
+    """
+    def __init__(self, db, embedder=None):
+        self.db = db
+        self.enabled = faiss is not None and (
+            embedder is not None or (InferenceClient is not None and bool(os.environ.get('HF_TOKEN'))))
+        self.embedder = embedder
+        self.model = getattr(embedder, 'model', EMBED_MODEL)
+        self._index = None
+        self._vectors = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._pending_full = False
+        self._pending_new = False
+        self._pending_ids = set()
+        self._worker_running = False
+
+    @property
+    def ready(self):
+        return self._index is not None
+
+    def _course_rows(self, conn, where='', params=()):
+        """(course_id, text_hash, text) for the selected courses"""
+        rows = conn.execute(f'''
+            SELECT c.id, c.title, c.description, cc.content, cc.compressed
+            FROM courses c LEFT JOIN course_contents cc ON cc.course_id = c.id {where}
+        ''', params)
+        for row in rows:
+            content = self.db.decode_content(row['content'], row['compressed']) if row['content'] is not None else ''
+            text = course_text(row['title'], row['description'], content)
+            yield row['id'], hashlib.sha256(text.encode('utf-8')).hexdigest(), text
+
+    def _embed_and_store(self, conn, todo):
+        """Embed [(course_id, text_hash, text)] and store the vectors; returns {course_id: vector}"""
+        if not todo:
+            return {}
+        if self.embedder is None:
+            self.embedder = HFEmbedder()
+        vectors = self.embedder([text for _, _, text in todo])
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO course_embeddings (course_id, model, text_hash, vector)
+                VALUES (?, ?, ?, ?)
+            ''', [(course_id, self.model, text_hash, vector.tobytes())
+                  for (course_id, text_hash, _), vector in zip(todo, vectors)])
+        return {course_id: vector for (course_id, _, _), vector in zip(todo, vectors)}
+
+    def sync(self):
+        """Full sync: embed new or changed courses, drop deleted ones, and rebuild the index"""
+        if not self.enabled:
+            return
+
+        with self._sync_lock:
+            conn = self.db.get_connection()
+            try:
+                stored = {row['course_id']: row['text_hash'] for row in conn.execute(
+                    'SELECT course_id, text_hash FROM course_embeddings WHERE model = ?', (self.model,))}
+
+                todo = []
+                current = set()
+                for course_id, text_hash, text in self._course_rows(conn):
+                    current.add(course_id)
+                    if stored.get(course_id) != text_hash:
+                        todo.append((course_id, text_hash, text))
+                self._embed_and_store(conn, todo)
+
+                removed = set(stored) - current
+                if removed:
+                    with conn:
+                        conn.executemany('DELETE FROM course_embeddings WHERE course_id = ?',
+                                         [(course_id,) for course_id in removed])
+
+                vectors = {row['course_id']: np.frombuffer(row['vector'], dtype=np.float32)
+                           for row in conn.execute('SELECT course_id, vector FROM course_embeddings WHERE model = ?',
+                                                   (self.model,))}
+            finally:
+                conn.close()
+
+            self._rebuild(vectors)
+
+    def sync_courses(self, course_ids):
+        """Embed the given courses if new or changed and patch them into the live index"""
+        if not self.enabled:
+            return
+
+        if self._index is None:
+            return self.sync()
+
+        with self._sync_lock:
+            course_ids = sorted(set(course_ids))
+            updated = {}
+            found = set()
+            conn = self.db.get_connection()
+            try:
+                # Chunked to stay under SQLite's bound-parameter limit
+                for i in range(0, len(course_ids), 500):
+                    ids = course_ids[i:i + 500]
+                    placeholders = ', '.join('?' * len(ids))
+                    stored = {row['course_id']: row['text_hash'] for row in conn.execute(
+                        f'SELECT course_id, text_hash FROM course_embeddings WHERE model = ? AND course_id IN ({placeholders})',
+                        (self.model, *ids))}
+                    todo = []
+                    for course_id, text_hash, text in self._course_rows(conn, f'WHERE c.id IN ({placeholders})', ids):
+                        found.add(course_id)
+                        if stored.get(course_id) != text_hash or course_id not in self._vectors:
+                            todo.append((course_id, text_hash, text))
+                    updated.update(self._embed_and_store(conn, todo))
+            finally:
+                conn.close()
+
+            self._patch(updated, set(course_ids) - found)
+
+    def sync_new(self):
+        """Sync courses with ids above the highest one in the index (e.g. after an import)"""
+        if not self.enabled:
+            return
+        if self._index is None:
+            return self.sync()
+        conn = self.db.get_connection()
+        try:
+            course_ids = [row[0] for row in conn.execute(
+                'SELECT id FROM courses WHERE id > ?', (max(self._vectors, default=0),))]
+        finally:
+            conn.close()
+        if course_ids:
+            self.sync_courses(course_ids)
+
+    def _rebuild(self, vectors):
+        index = None
+        if vectors:
+            ids = np.array(list(vectors), dtype=np.int64)
+            matrix = np.vstack(list(vectors.values()))
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(matrix.shape[1]))
+            index.add_with_ids(matrix, ids)
+        with self._lock:
+            self._index = index
+            self._vectors = vectors
+
+    def _patch(self, updated, removed):
+        """Replace updated vectors and drop removed ids in the live index"""
+        if not updated and not removed:
+            return
+        with self._lock:
+            vectors = dict(self._vectors)
+            stale = [course_id for course_id in (*updated, *removed) if course_id in vectors]
+            if stale:
+                self._index.remove_ids(np.array(stale, dtype=np.int64))
+            for course_id in removed:
+                vectors.pop(course_id, None)
+            if updated:
+                self._index.add_with_ids(np.vstack(list(updated.values())),
+                                         np.array(list(updated), dtype=np.int64))
+                vectors.update(updated)
+            self._vectors = vectors
+
+    def schedule_sync(self, course_ids=None, new=False):
+        """Sync in a background thread; calls made while one is running coalesce.
+
+        With course_ids, only those courses are synced; with new=True, courses
+        added since the last sync. With neither, a full sync and rebuild.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if course_ids is not None:
+                self._pending_ids.update(course_ids)
+            elif new:
+                self._pending_new = True
+            else:
+                self._pending_full = True
+            if self._worker_running:
+                return
+            self._worker_running = True
+        threading.Thread(target=self._background_sync, name='course-index-sync', daemon=True).start()
+
+    def _background_sync(self):
+        while True:
+            with self._lock:
+                full, new, course_ids = self._pending_full, self._pending_new, self._pending_ids
+                if not (full or new or course_ids):
+                    self._worker_running = False
+                    return
+                self._pending_full = self._pending_new = False
+                self._pending_ids = set()
+            try:
+                if full:
+                    self.sync()
+                else:
+                    if course_ids:
+                        self.sync_courses(course_ids)
+                    if new:
+                        self.sync_new()
+            except Exception:
+                logger.exception('Course index sync failed')
+
+    def remove(self, course_id):
+        """Drop a deleted course from the in-memory index immediately"""
+        with self._lock:
+            if self._index is not None and course_id in self._vectors:
+                self._index.remove_ids(np.array([course_id], dtype=np.int64))
+                vectors = dict(self._vectors)
+                del vectors[course_id]
+                self._vectors = vectors
+
+    def _search(self, query, k, exclude):
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0 or k < 1:
+                return []
+            k = min(k + len(exclude), self._index.ntotal)
+            scores, ids = self._index.search(query[None, :], k)
+        return [(int(course_id), float(score)) for score, course_id in zip(scores[0], ids[0])
+                if course_id >= 0 and int(course_id) not in exclude]
+
+    def similar(self, course_id, k=5):
+        """[(course_id, score)] for courses closest to course_id"""
+        vector = self._vectors.get(course_id)
+        if vector is None:
+            return []
+        return self._search(vector, k, {course_id})[:k]
+
+    def recommend(self, course_ids, k=5):
+        """[(course_id, score)] closest to the mean of the given courses, excluding them"""
+        vectors = [self._vectors[course_id] for course_id in course_ids if course_id in self._vectors]
+        if not vectors:
+            return []
+        profile = l2_normalize(np.mean(vectors, axis=0, keepdims=True))[0]
+        return self._search(profile, k, set(course_ids))[:k]
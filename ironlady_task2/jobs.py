@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+import uuid
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, fn, args):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.timing = None
+        self._finished = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job is done or failed; False on timeout"""
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        if self.timing:
+            data['timing'] = self.timing
+        return data
+
+
+class JobQueue:
+    """Bounded worker pool for slow calls such as LLM generation.
+
+    Jobs with the same key share one run while queued or running, so
+    repeated clicks on the same course do not pile up on the Ollama host.
+    Finished jobs are kept for keep_finished seconds so clients can poll.
+    """
+    def __init__(self, workers=2, max_queued=100, keep_finished=600):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        # Optional wrapper that runs each job, e.g. RequestProfiler._profile_job
+        self.around_job = None
+
+    def submit(self, key, fn, *args):
+        """Queue fn(*args), or return the in-flight job with the same key"""
+        with self._lock:
+            self._purge_finished()
+            job = self._active.get(key)
+            if job:
+                return job
+
+            job = Job(key, fn, args)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull('Too many jobs queued, try again shortly')
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._start_workers()
+            return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'job-worker-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            try:
+                if self.around_job is not None:
+                    job.result = self.around_job(job)
+                else:
+                    job.result = job.fn(*job.args)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                job._finished.set()
+                with self._lock:
+                    if self._active.get(job.key) is job:
+                        del self._active[job.key]
+                self._queue.task_done()
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.keep_finished
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TokenFeed:
+    """Job function that streams tokens to any number of readers.
+
+    Run on a JobQueue worker, it buffers what tokens() yields. Each reader
+    replays the buffer and then follows along, so a second stream for the
+    same key shares the first one's generation. If every reader goes away
+    before the end, and no poller has joined (keep), generation stops and
+    tokens() is closed. finish(text) turns the full text into the job result.
+    """
+    def __init__(self, tokens, finish):
+        self.tokens = tokens
+        self.finish = finish
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.keep = False
+        self._readers = 0
+        self._abandoned = False
+        self._cond = threading.Condition()
+
+    def __call__(self):
+        stream = self.tokens()
+        try:
+            for token in stream:
+                with self._cond:
+                    if self._abandoned:
+                        raise Cancelled('Generation cancelled: every client disconnected')
+                    self.parts.append(token)
+                    self._cond.notify_all()
+            result = self.finish(''.join(self.parts))
+        except Exception as e:
+            self._end(str(e))
+            raise
+        finally:
+            stream.close()
+        self._end(None)
+        return result
+
+    def _end(self, error):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def read(self):
+        """Yield every token from the start; check error once exhausted"""
+        with self._cond:
+            self._readers += 1
+            self._abandoned = False
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    while index == len(self.parts) and not self.done:
+                        self._cond.wait()
+                    new = self.parts[index:]
+                    done = self.done
+                index += len(new)
+                yield from new
+                if done:
+                    return
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0 and not self.done and not self.keep:
+                    self._abandoned = True
@@ -0,0 +1,332 @@
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from seed_data import WORDS, LAST_NAMES, seed
+from stub_ollama import start_stub_server
+
+
+class TestClientAdapter:
+    """Flask test client, in process"""
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, json=None, headers=None):
+        response = self.client.open(path, method=method, data=data, json=json, headers=headers)
+        return response.status_code, response.headers, response.get_data()  # consumes streamed bodies
+
+    def upload(self, path, fields, filename, body, headers=None):
+        data = dict(fields, file=(io.BytesIO(body), filename))
+        return self.request('POST', path, data=data, headers=headers)
+
+
+class HTTPAdapter:
+    """requests.Session against a running server"""
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None, json=None, headers=None, files=None):
+        response = self.session.request(method, self.base_url + path, data=data, json=json,
+                                        headers=headers, files=files, allow_redirects=False)
+        return response.status_code, response.headers, response.content
+
+    def upload(self, path, fields, filename, body, headers=None):
+        return self.request('POST', path, data=fields, headers=headers, files={'file': (filename, body)})
+
+
+class Scenario:
+    """Weighted mix of requests covering every route in app.py"""
+    def __init__(self, max_student_id, max_course_id, run_id):
+        self.max_student_id = max_student_id
+        self.max_course_id = max_course_id
+        self.run_id = run_id
+        self.job_ids = []
+        self.etags = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.routes = [
+            ('GET /', 3, lambda c, r: c.request('GET', '/')),
+            ('GET /students', 1, lambda c, r: c.request('GET', '/students')),
+            ('GET /courses', 2, lambda c, r: c.request('GET', '/courses')),
+            ('GET /course/<id>', 10, lambda c, r: c.request('GET', f'/course/{self.course(r)}')),
+            ('GET /course/<id> (conditional)', 4, self.conditional_course),
+            ('GET /student/<id>', 10, lambda c, r: c.request('GET', f'/student/{self.student(r)}')),
+            ('GET /search', 8, lambda c, r: c.request('GET', f'/search?q={r.choice(WORDS)}')),
+            ('GET /search (students)', 3, lambda c, r: c.request('GET', f'/search?type=students&q={r.choice(LAST_NAMES)}')),
+            ('GET /summarize_course/<id>', 3, self.summarize),
+            ('GET /generate_outline/<id>', 2, lambda c, r: c.request('GET', f'/generate_outline/{self.course(r)}')),
+            ('GET /summarize_course/<id>/stream', 2, lambda c, r: c.request('GET', f'/summarize_course/{self.course(r)}/stream')),
+            ('GET /generate_outline/<id>/stream', 1, lambda c, r: c.request('GET', f'/generate_outline/{self.course(r)}/stream')),
+            ('GET /jobs/<id>', 2, self.poll_job),
+            ('GET /similar_courses/<id>', 2, lambda c, r: c.request('GET', f'/similar_courses/{self.course(r)}')),
+            ('GET /recommended_courses/<id>', 2, lambda c, r: c.request('GET', f'/recommended_courses/{self.student(r)}')),
+            ('GET /add_student', 1, lambda c, r: c.request('GET', '/add_student')),
+            ('GET /add_course', 1, lambda c, r: c.request('GET', '/add_course')),
+            ('GET /import', 1, lambda c, r: c.request('GET', '/import')),
+            ('POST /add_student', 2, self.add_student),
+            ('POST /add_course', 1, self.add_course),
+            ('POST /enroll', 2, lambda c, r: c.request('POST', '/enroll', data={
+                'student_id': self.student(r), 'course_id': self.course(r)})),
+            ('POST /enroll_batch', 1, lambda c, r: c.request('POST', '/enroll_batch', json={
+                'course_id': self.course(r), 'student_ids': [self.student(r) for _ in range(20)]})),
+            ('POST /enrollment_status_batch', 1, lambda c, r: c.request('POST', '/enrollment_status_batch', json={
+                'student_id': self.student(r), 'course_ids': [self.course(r) for _ in range(5)],
+                'completion_status': 'In Progress'})),
+            ('POST /import', 1, self.import_csv),
+        ]
+        self.weights = [weight for _, weight, _ in self.routes]
+
+    def student(self, rng):
+        return rng.randint(1, self.max_student_id)
+
+    def course(self, rng):
+        return rng.randint(1, self.max_course_id)
+
+    def unique(self):
+        with self._lock:
+            self._counter += 1
+            return f'{self.run_id}-{self._counter}'
+
+    def pick(self, rng):
+        return rng.choices(self.routes, weights=self.weights)[0]
+
+    def conditional_course(self, client, rng):
+        course_id = self.course(rng) % 50 + 1  # small hot set, so ETags get reused
+        headers = {}
+        if course_id in self.etags:
+            headers['If-None-Match'] = self.etags[course_id]
+        response = client.request('GET', f'/course/{course_id}', headers=headers)
+        if response[1].get('ETag'):
+            self.etags[course_id] = response[1]['ETag']
+        return response
+
+    def summarize(self, client, rng):
+        response = client.request('GET', f'/summarize_course/{self.course(rng)}')
+        if response[0] == 202:
+            with self._lock:
+                self.job_ids.append(json.loads(response[2])['job_id'])
+                del self.job_ids[:-100]
+        return response
+
+    def poll_job(self, client, rng):
+        if not self.job_ids:
+            return self.summarize(client, rng)
+        return client.request('GET', f'/jobs/{rng.choice(self.job_ids)}')
+
+    def add_student(self, client, rng):
+        tag = self.unique()
+        return client.request('POST', '/add_student', data={
+            'name': f'Load Test {tag}', 'email': f'loadtest-{tag}@example.com', 'phone': ''})
+
+    def add_course(self, client, rng):
+        return client.request('POST', '/add_course', data={
+            'title': f'Load Test Course {self.unique()}', 'description': 'Created by loadtest.py',
+            'content': ' '.join(rng.choice(WORDS) for _ in range(200)), 'instructor': 'Load Tester',
+            'duration_hours': '10', 'difficulty_level': 'Beginner'})
+
+    def import_csv(self, client, rng):
+        rows = ['name,email,phone'] + [f'Import {tag},import-{tag}@example.com,'
+                                       for tag in (self.unique() for _ in range(50))]
+        return client.upload('/import', {'kind': 'students'}, 'load.csv', '\n'.join(rows).encode('utf-8'),
+                             headers={'Accept': 'application/json'})
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run(make_client, scenario, concurrency, duration, seed_value=0):
+    """Drive the scenario from concurrency threads for duration seconds"""
+    timings = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed_value * 1000 + worker_id)
+        client = make_client()
+        local = []
+        while time.perf_counter() < deadline:
+            name, _, fn = scenario.pick(rng)
+            started = time.perf_counter()
+            try:
+                status = fn(client, rng)[0]
+            except Exception as e:
+                status = f'exception: {type(e).__name__}'
+            local.append((name, (time.perf_counter() - started) * 1000, status))
+        with lock:
+            for name, elapsed, status in local:
+                timings[name].append(elapsed)
+                statuses[name][str(status)] += 1
+                if not isinstance(status, int) or (status >= 500 and status != 503):
+                    errors[name] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    routes = {}
+    for name, values in sorted(timings.items()):
+        values.sort()
+        routes[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'statuses': dict(statuses[name]),
+            'throughput_rps': round(len(values) / wall, 2),
+            'mean_ms': round(sum(values) / len(values), 2),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(values[-1], 2),
+        }
+    all_values = sorted(v for values in timings.values() for v in values)
+    total = {
+        'requests': len(all_values),
+        'errors': sum(errors.values()),
+        'throughput_rps': round(len(all_values) / wall, 2),
+        'p50_ms': round(percentile(all_values, 50), 2),
+        'p95_ms': round(percentile(all_values, 95), 2),
+        'p99_ms': round(percentile(all_values, 99), 2),
+    }
+    return routes, total, wall
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _table_counts(db_path):
+    conn = sqlite3.connect(db_path)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('students', 'courses', 'enrollments')}
+    conn.close()
+    return counts
+
+
+def print_report(routes, total):
+    print(f"{'route':<38} {'reqs':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, r in routes.items():
+        print(f"{name:<38} {r['requests']:>6} {r['errors']:>4} {r['throughput_rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+    print(f"{'TOTAL':<38} {total['requests']:>6} {total['errors']:>4} {total['throughput_rps']:>8} "
+          f"{total['p50_ms']:>8} {total['p95_ms']:>8} {total['p99_ms']:>8}")
+
+
+def print_comparison(routes, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['routes']
+    print(f"\nChange vs {baseline_path} (negative is faster)")
+    print(f"{'route':<38} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}")
+    for name, r in routes.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+
+        def delta(key):
+            return f"{(r[key] - old[key]) / old[key]:+.0%}" if old[key] else 'n/a'
+        print(f"{name:<38} {delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9} {delta('throughput_rps'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the course management app against a stub Ollama server')
+    parser.add_argument('--db', default='loadtest.db', help='Database to test against; seeded if it does not exist')
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--courses', type=int, default=5000)
+    parser.add_argument('--enrollments', type=int, default=1000000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--server', action='store_true',
+                        help='Run a local threaded HTTP server instead of the in-process test client')
+    parser.add_argument('--ollama-delay', type=float, default=0.05, help='Stub generation time in seconds')
+    parser.add_argument('--output', default='loadtest_results.json')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        from models import Database
+        print(f'Seeding {args.db} ...')
+        seed(Database(args.db), args.students, args.courses, args.enrollments)
+
+    stub, stub_url = start_stub_server(generate_delay=args.ollama_delay)
+    # app reads its configuration at import time
+    os.environ['DATABASE_PATH'] = args.db
+    os.environ['OLLAMA_BASE_URL'] = stub_url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')  # no time-to-first-token line per stream
+    import app as app_module
+
+    counts = _table_counts(args.db)
+    conn = sqlite3.connect(args.db)
+    max_student_id = conn.execute('SELECT MAX(id) FROM students').fetchone()[0] or 1
+    max_course_id = conn.execute('SELECT MAX(id) FROM courses').fetchone()[0] or 1
+    conn.close()
+    scenario = Scenario(max_student_id, max_course_id, run_id=datetime.now().strftime('%Y%m%d%H%M%S'))
+
+    server = None
+    if args.server:
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request access log
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        make_client = lambda: HTTPAdapter(base_url)
+    else:
+        make_client = lambda: TestClientAdapter(app_module.app)
+
+    print(f"Running {args.duration:g}s with {args.concurrency} workers "
+          f"({'HTTP server' if args.server else 'test client'}) on {counts}")
+    routes, total, wall = run(make_client, scenario, args.concurrency, args.duration)
+
+    if server:
+        server.shutdown()
+    stub.shutdown()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'mode': 'server' if args.server else 'test_client',
+            'concurrency': args.concurrency,
+            'duration_s': round(wall, 2),
+            'ollama_delay_s': args.ollama_delay,
+            'data': counts,
+        },
+        'total': total,
+        'routes': routes,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print_report(routes, total)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        print_comparison(routes, args.compare)
+
+
+if __name__ == '__main__':
+    main()
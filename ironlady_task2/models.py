@@ -1,13 +1,58 @@
+import hashlib
 import sqlite3
+import zlib
 from datetime import datetime
 
+# Columns rendered by list views; course content lives in course_contents
+COURSE_LIST_COLUMNS = 'id, title, description, instructor, duration_hours, difficulty_level, created_at'
+STUDENT_LIST_COLUMNS = 'id, name, email, phone, enrollment_date'
+
+DIFFICULTY_LEVELS = ('Beginner', 'Intermediate', 'Advanced')
+COMPLETION_STATUSES = ('Enrolled', 'In Progress', 'Completed', 'Dropped')
+
+# Data-version counters: each write to a source table bumps its group's version
+VERSIONED_TABLES = {
+    'students': 'students',
+    'courses': 'courses',
+    'course_contents': 'courses',
+    'enrollments': 'enrollments',
+    'ai_results': 'ai_results',
+}
+
+# Markers wrapped around matched terms in search snippets (escaped and
+# turned into <mark> by the view)
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+COURSES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        instructor TEXT,
+        duration_hours INTEGER,
+        difficulty_level TEXT CHECK(difficulty_level IN ('Beginner', 'Intermediate', 'Advanced')),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Content shorter than this is stored as plain text even when compression is on
+COMPRESS_MIN_BYTES = 1024
+
 class Database:
-    def __init__(self, db_name='course_management.db'):
+    def __init__(self, db_name='course_management.db', compress_content=False):
         self.db_name = db_name
+        self.compress_content = compress_content
+        self.search_enabled = True
+        self.profiler = None  # set by RequestProfiler.init_app when profiling is on
         self.init_database()
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
+        conn = None
+        if self.profiler is not None:
+            conn = self.profiler.connect(self.db_name)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -26,20 +71,21 @@ class Database:
             )
         ''')
         
-        # Courses table with full content
+        # Courses table (metadata only, content is stored separately)
+        conn.execute(COURSES_TABLE_SQL.format(name='courses'))
+        
+        # Full course content, loaded only by the detail page and the summarizer
         conn.execute('''
-            CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                content TEXT NOT NULL,
-                instructor TEXT,
-                duration_hours INTEGER,
-                difficulty_level TEXT CHECK(difficulty_level IN ('Beginner', 'Intermediate', 'Advanced')),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS course_contents (
+                course_id INTEGER PRIMARY KEY,
+                content BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE
             )
         ''')
         
+        self._migrate_course_content(conn)
+        
         # Student-Course enrollment relationship
         conn.execute('''
             CREATE TABLE IF NOT EXISTS enrollments (
@@ -54,8 +100,189 @@ class Database:
             )
         ''')
         
+        # Generated summaries/outlines keyed by the exact input they were built from
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ai_results (
+                course_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (course_id, kind, model, prompt_version, input_hash)
+            )
+        ''')
+        
+        # Course embeddings for semantic search (see course_index.py)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS course_embeddings (
+                course_id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL
+            )
+        ''')
+        
+        self._init_search(conn)
+        self._init_versions(conn)
+        
         conn.commit()
         conn.close()
+    
+    def _init_search(self, conn):
+        """FTS5 indexes over courses and students, kept in sync by triggers"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'courses_fts'"
+        ).fetchone()
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts
+                USING fts5(title, description, content, instructor)
+            ''')
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS students_fts
+                USING fts5(name, email)
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            self.search_enabled = False
+            return
+        
+        conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS courses_fts_insert AFTER INSERT ON courses BEGIN
+                INSERT INTO courses_fts (rowid, title, description, content, instructor)
+                VALUES (new.id, new.title, new.description, '', new.instructor);
+            END;
+            CREATE TRIGGER IF NOT EXISTS courses_fts_update AFTER UPDATE OF title, description, instructor ON courses BEGIN
+                UPDATE courses_fts SET title = new.title, description = new.description, instructor = new.instructor
+                WHERE rowid = new.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS courses_fts_delete AFTER DELETE ON courses BEGIN
+                DELETE FROM courses_fts WHERE rowid = old.id;
+            END;
+            
+            -- Compressed content is indexed by the application (see index_course_content)
+            CREATE TRIGGER IF NOT EXISTS course_contents_fts_insert AFTER INSERT ON course_contents
+            WHEN new.compressed = 0 BEGIN
+                UPDATE courses_fts SET content = new.content WHERE rowid = new.course_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS course_contents_fts_update AFTER UPDATE OF content ON course_contents
+            WHEN new.compressed = 0 BEGIN
+                UPDATE courses_fts SET content = new.content WHERE rowid = new.course_id;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+                INSERT INTO students_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+            END;
+            CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE OF name, email ON students BEGIN
+                UPDATE students_fts SET name = new.name, email = new.email WHERE rowid = new.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+                DELETE FROM students_fts WHERE rowid = old.id;
+            END;
+        ''')
+        
+        if not exists:
+            # First run on an existing database: index what is already there
+            conn.execute('''
+                INSERT INTO courses_fts (rowid, title, description, content, instructor)
+                SELECT c.id, c.title, c.description, '', c.instructor FROM courses c
+            ''')
+            conn.execute('INSERT INTO students_fts (rowid, name, email) SELECT id, name, email FROM students')
+            for row in conn.execute('SELECT course_id, content, compressed FROM course_contents').fetchall():
+                self.index_course_content(conn, row['course_id'],
+                                          self.decode_content(row['content'], row['compressed']))
+    
+    def _init_versions(self, conn):
+        """Per-table version counters, bumped by triggers on every write"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now'))
+            )
+        ''')
+        for table, name in VERSIONED_TABLES.items():
+            conn.execute('INSERT OR IGNORE INTO data_versions (name) VALUES (?)', (name,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                        UPDATE data_versions SET version = version + 1, updated_at = strftime('%s', 'now')
+                        WHERE name = '{name}';
+                    END
+                ''')
+    
+    def get_versions(self, names):
+        """Return ({name: version}, last_updated_unix_time) for the given groups"""
+        conn = self.get_connection()
+        placeholders = ', '.join('?' * len(names))
+        rows = conn.execute(
+            f'SELECT name, version, updated_at FROM data_versions WHERE name IN ({placeholders})', list(names)
+        ).fetchall()
+        conn.close()
+        versions = {row['name']: row['version'] for row in rows}
+        last_updated = max((row['updated_at'] for row in rows), default=0)
+        return versions, last_updated
+    
+    def index_course_content(self, conn, course_id, content):
+        """Set the searchable content of a course (needed when it is stored compressed)"""
+        if self.search_enabled:
+            conn.execute('UPDATE courses_fts SET content = ? WHERE rowid = ?', (content, course_id))
+    
+    def _migrate_course_content(self, conn):
+        """Move content out of databases created with courses.content"""
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(courses)')]
+        if 'content' not in columns:
+            return
+        
+        conn.execute('''
+            INSERT OR IGNORE INTO course_contents (course_id, content, compressed)
+            SELECT id, content, 0 FROM courses
+        ''')
+        try:
+            conn.execute('ALTER TABLE courses DROP COLUMN content')
+        except sqlite3.OperationalError:
+            # SQLite < 3.35 cannot drop columns; rebuild the table without it
+            self._rebuild_courses_table(conn)
+    
+    def _rebuild_courses_table(self, conn):
+        """Copy courses into a table with the current schema and swap it in"""
+        columns = 'id, title, description, instructor, duration_hours, difficulty_level, created_at'
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'courses'").fetchone()
+        conn.execute('DROP TABLE IF EXISTS courses_new')
+        conn.execute(COURSES_TABLE_SQL.format(name='courses_new'))
+        conn.execute(f'INSERT INTO courses_new ({columns}) SELECT {columns} FROM courses')
+        conn.execute('DROP TABLE courses')
+        conn.execute('ALTER TABLE courses_new RENAME TO courses')
+        if seq:
+            # Keep ids of deleted courses from being reused
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'courses'", (seq[0],))
+    
+    def encode_content(self, content):
+        """Return (value, compressed) for storing course content"""
+        data = content.encode('utf-8')
+        if self.compress_content and len(data) >= COMPRESS_MIN_BYTES:
+            return zlib.compress(data), 1
+        return content, 0
+    
+    @staticmethod
+    def decode_content(value, compressed):
+        """Inverse of encode_content"""
+        if compressed:
+            return zlib.decompress(value).decode('utf-8')
+        return value
+
+def _existing_ids(conn, table, ids, chunk_size=500):
+    """Subset of ids present in table, queried in chunks to stay under SQLite's variable limit"""
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        placeholders = ', '.join('?' * len(chunk))
+        rows = conn.execute(f'SELECT id FROM {table} WHERE id IN ({placeholders})', chunk)
+        found.update(row[0] for row in rows)
+    return found
 
 class Student:
     def __init__(self, db):
@@ -77,10 +304,16 @@ class Student:
     
     def get_all(self):
         conn = self.db.get_connection()
-        students = conn.execute('SELECT * FROM students ORDER BY name').fetchall()
+        students = conn.execute(f'SELECT {STUDENT_LIST_COLUMNS} FROM students ORDER BY name').fetchall()
         conn.close()
         return students
     
+    def count(self):
+        conn = self.db.get_connection()
+        total = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+        conn.close()
+        return total
+    
     def get_by_id(self, student_id):
         conn = self.db.get_connection()
         student = conn.execute('SELECT * FROM students WHERE id = ?', (student_id,)).fetchone()
@@ -99,27 +332,81 @@ class Course:
     
     def create(self, title, description, content, instructor, duration_hours, difficulty_level):
         conn = self.db.get_connection()
-        conn.execute(
-            'INSERT INTO courses (title, description, content, instructor, duration_hours, difficulty_level) VALUES (?, ?, ?, ?, ?, ?)',
-            (title, description, content, instructor, duration_hours, difficulty_level)
-        )
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO courses (title, description, instructor, duration_hours, difficulty_level) VALUES (?, ?, ?, ?, ?)',
+                (title, description, instructor, duration_hours, difficulty_level)
+            )
+            course_id = cursor.lastrowid
+            value, compressed = self.db.encode_content(content)
+            conn.execute(
+                'INSERT INTO course_contents (course_id, content, compressed) VALUES (?, ?, ?)',
+                (course_id, value, compressed)
+            )
+            if compressed:
+                self.db.index_course_content(conn, course_id, content)
+            conn.commit()
+            return course_id
+        finally:
+            conn.close()
     
     def get_all(self):
         conn = self.db.get_connection()
-        courses = conn.execute('SELECT * FROM courses ORDER BY title').fetchall()
+        courses = conn.execute(f'SELECT {COURSE_LIST_COLUMNS} FROM courses ORDER BY title').fetchall()
         conn.close()
         return courses
     
+    def count(self):
+        conn = self.db.get_connection()
+        total = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+        conn.close()
+        return total
+    
     def get_by_id(self, course_id):
+        """Course metadata without content"""
+        conn = self.db.get_connection()
+        course = conn.execute(f'SELECT {COURSE_LIST_COLUMNS} FROM courses WHERE id = ?', (course_id,)).fetchone()
+        conn.close()
+        return course
+    
+    def get_many(self, course_ids):
+        """Course metadata for the given ids, in the same order"""
+        if not course_ids:
+            return []
+        conn = self.db.get_connection()
+        placeholders = ', '.join('?' * len(course_ids))
+        rows = conn.execute(
+            f'SELECT {COURSE_LIST_COLUMNS} FROM courses WHERE id IN ({placeholders})', list(course_ids)
+        ).fetchall()
+        conn.close()
+        by_id = {row['id']: row for row in rows}
+        return [by_id[course_id] for course_id in course_ids if course_id in by_id]
+    
+    def get_content(self, course_id):
+        """Full course content, or None if the course has none"""
         conn = self.db.get_connection()
-        course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+        row = conn.execute(
+            'SELECT content, compressed FROM course_contents WHERE course_id = ?', (course_id,)
+        ).fetchone()
         conn.close()
+        if not row:
+            return None
+        return self.db.decode_content(row['content'], row['compressed'])
+    
+    def get_with_content(self, course_id):
+        """Course metadata plus content as a dict, for the detail page"""
+        course = self.get_by_id(course_id)
+        if not course:
+            return None
+        course = dict(course)
+        course['content'] = self.get_content(course_id) or ''
         return course
     
     def delete(self, course_id):
         conn = self.db.get_connection()
+        conn.execute('DELETE FROM ai_results WHERE course_id = ?', (course_id,))
+        conn.execute('DELETE FROM course_embeddings WHERE course_id = ?', (course_id,))
+        conn.execute('DELETE FROM course_contents WHERE course_id = ?', (course_id,))
         conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
         conn.commit()
         conn.close()
@@ -131,31 +418,75 @@ class Enrollment:
     def enroll_student(self, student_id, course_id):
         conn = self.db.get_connection()
         try:
-            # Check if enrollment already exists
-            existing = conn.execute(
-                'SELECT id FROM enrollments WHERE student_id = ? AND course_id = ?',
-                (student_id, course_id)
-            ).fetchone()
-            
-            if existing:
-                return False  # Already enrolled
-            
-            # Create new enrollment
-            conn.execute(
-                'INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)',
+            cursor = conn.execute(
+                'INSERT INTO enrollments (student_id, course_id) VALUES (?, ?) '
+                'ON CONFLICT (student_id, course_id) DO NOTHING',
                 (student_id, course_id)
             )
             conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+            return cursor.rowcount == 1  # 0 means already enrolled
+        finally:
+            conn.close()
+    
+    def enroll_batch(self, pairs):
+        """Enroll many (student_id, course_id) pairs in one transaction.
+        
+        Returns lists of pairs that were created, already existed, or
+        referenced a missing student or course.
+        """
+        pairs = list(dict.fromkeys((int(s), int(c)) for s, c in pairs))
+        result = {'created': [], 'existing': [], 'missing': []}
+        if not pairs:
+            return result
+        
+        conn = self.db.get_connection()
+        try:
+            students = _existing_ids(conn, 'students', {s for s, _ in pairs})
+            courses = _existing_ids(conn, 'courses', {c for _, c in pairs})
+            with conn:
+                for pair in pairs:
+                    student_id, course_id = pair
+                    if student_id not in students or course_id not in courses:
+                        result['missing'].append(pair)
+                        continue
+                    cursor = conn.execute(
+                        'INSERT INTO enrollments (student_id, course_id) VALUES (?, ?) '
+                        'ON CONFLICT (student_id, course_id) DO NOTHING',
+                        pair
+                    )
+                    result['created' if cursor.rowcount else 'existing'].append(pair)
+            return result
+        finally:
+            conn.close()
+    
+    def update_status_batch(self, pairs, completion_status):
+        """Set completion_status for many enrollments in one transaction"""
+        if completion_status not in COMPLETION_STATUSES:
+            raise ValueError(f'Invalid completion status: {completion_status}')
+        
+        pairs = list(dict.fromkeys((int(s), int(c)) for s, c in pairs))
+        result = {'updated': [], 'missing': []}
+        if not pairs:
+            return result
+        
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                for pair in pairs:
+                    cursor = conn.execute(
+                        'UPDATE enrollments SET completion_status = ? WHERE student_id = ? AND course_id = ?',
+                        (completion_status,) + pair
+                    )
+                    result['updated' if cursor.rowcount else 'missing'].append(pair)
+            return result
         finally:
             conn.close()
     
     def get_student_courses(self, student_id):
         conn = self.db.get_connection()
         courses = conn.execute('''
-            SELECT c.*, e.enrollment_date, e.completion_status 
+            SELECT c.id, c.title, c.description, c.instructor, c.duration_hours, c.difficulty_level,
+                   e.enrollment_date, e.completion_status 
             FROM courses c 
             JOIN enrollments e ON c.id = e.course_id 
             WHERE e.student_id = ?
@@ -167,7 +498,7 @@ class Enrollment:
     def get_course_students(self, course_id):
         conn = self.db.get_connection()
         students = conn.execute('''
-            SELECT s.*, e.enrollment_date, e.completion_status 
+            SELECT s.id, s.name, s.email, e.enrollment_date, e.completion_status 
             FROM students s 
             JOIN enrollments e ON s.id = e.student_id 
             WHERE e.course_id = ?
@@ -175,4 +506,141 @@ class Enrollment:
         ''', (course_id,)).fetchall()
         conn.close()
         return students
+    
+    def get_available_courses(self, student_id):
+        """Courses the student is not enrolled in, for the enrollment modal"""
+        conn = self.db.get_connection()
+        courses = conn.execute('''
+            SELECT c.id, c.title, c.difficulty_level, c.instructor
+            FROM courses c
+            WHERE c.id NOT IN (SELECT course_id FROM enrollments WHERE student_id = ?)
+            ORDER BY c.title
+        ''', (student_id,)).fetchall()
+        conn.close()
+        return courses
 
+class SummaryCache:
+    """Persistent cache of LLM output for a course.
+    
+    Entries are keyed by a hash of the text the prompt was built from, so
+    editing a course produces a new key and the old entry is never served.
+    """
+    def __init__(self, db):
+        self.db = db
+    
+    @staticmethod
+    def input_hash(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update((part or '').encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def get(self, course_id, kind, model, prompt_version, input_hash):
+        conn = self.db.get_connection()
+        row = conn.execute('''
+            SELECT result FROM ai_results
+            WHERE course_id = ? AND kind = ? AND model = ? AND prompt_version = ? AND input_hash = ?
+        ''', (course_id, kind, model, prompt_version, input_hash)).fetchone()
+        conn.close()
+        return row['result'] if row else None
+    
+    def set(self, course_id, kind, model, prompt_version, input_hash, result):
+        conn = self.db.get_connection()
+        with conn:
+            # Older versions of this course's output can never be hit again
+            conn.execute(
+                'DELETE FROM ai_results WHERE course_id = ? AND kind = ? AND model = ?',
+                (course_id, kind, model)
+            )
+            conn.execute('''
+                INSERT OR REPLACE INTO ai_results (course_id, kind, model, prompt_version, input_hash, result)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (course_id, kind, model, prompt_version, input_hash, result))
+        conn.close()
+    
+    def get_partials(self, course_id, kind, model, prompt_version):
+        """All per-section results for a course as {input_hash: result}"""
+        conn = self.db.get_connection()
+        rows = conn.execute('''
+            SELECT input_hash, result FROM ai_results
+            WHERE course_id = ? AND kind = ? AND model = ? AND prompt_version = ?
+        ''', (course_id, kind, model, prompt_version)).fetchall()
+        conn.close()
+        return {row['input_hash']: row['result'] for row in rows}
+    
+    def set_partials(self, course_id, kind, model, prompt_version, partials):
+        """Replace a course's per-section results with partials"""
+        conn = self.db.get_connection()
+        with conn:
+            conn.execute(
+                'DELETE FROM ai_results WHERE course_id = ? AND kind = ? AND model = ?',
+                (course_id, kind, model)
+            )
+            conn.executemany('''
+                INSERT INTO ai_results (course_id, kind, model, prompt_version, input_hash, result)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(course_id, kind, model, prompt_version, h, result) for h, result in partials.items()])
+        conn.close()
+
+def fts_query(text):
+    """Turn free text into an FTS5 query.
+    
+    Every term must match. Only the last term is a prefix match, so partly
+    typed words still find results without expanding every term.
+    """
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in text.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+class Search:
+    def __init__(self, db):
+        self.db = db
+    
+    def courses(self, text, limit=20, offset=0):
+        """Return (total, rows) of courses matching text, best match first"""
+        query = fts_query(text)
+        if not query or not self.db.search_enabled:
+            return 0, []
+        
+        conn = self.db.get_connection()
+        total = conn.execute(
+            'SELECT COUNT(*) FROM courses_fts WHERE courses_fts MATCH ?', (query,)
+        ).fetchone()[0]
+        # Title matches weigh most, then instructor, description and content
+        rows = conn.execute(f'''
+            SELECT c.id, c.title, c.instructor, c.difficulty_level,
+                   highlight(courses_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS title_highlight,
+                   snippet(courses_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 24) AS snippet
+            FROM courses_fts
+            JOIN courses c ON c.id = courses_fts.rowid
+            WHERE courses_fts MATCH ?
+            ORDER BY bm25(courses_fts, 10.0, 3.0, 1.0, 5.0)
+            LIMIT ? OFFSET ?
+        ''', (query, limit, offset)).fetchall()
+        conn.close()
+        return total, rows
+    
+    def students(self, text, limit=20, offset=0):
+        """Return (total, rows) of students matching text, best match first"""
+        query = fts_query(text)
+        if not query or not self.db.search_enabled:
+            return 0, []
+        
+        conn = self.db.get_connection()
+        total = conn.execute(
+            'SELECT COUNT(*) FROM students_fts WHERE students_fts MATCH ?', (query,)
+        ).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT s.id, s.email,
+                   highlight(students_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS name_highlight,
+                   highlight(students_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS email_highlight
+            FROM students_fts
+            JOIN students s ON s.id = students_fts.rowid
+            WHERE students_fts MATCH ?
+            ORDER BY bm25(students_fts, 5.0, 1.0)
+            LIMIT ? OFFSET ?
+        ''', (query, limit, offset)).fetchall()
+        conn.close()
+        return total, rows
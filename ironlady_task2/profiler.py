@@ -0,0 +1,329 @@
+import heapq
+import itertools
+import re
+import sqlite3
+import threading
+import time
+
+from flask import before_render_template, request, template_rendered
+
+# Statements worth running EXPLAIN QUERY PLAN on
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+# Plan steps that are not table scans: FTS lookups, constants and subqueries
+NOT_FULL_SCAN = ('VIRTUAL TABLE', 'CONSTANT ROW', 'SUBQUERY', '(subquery', 'CO-ROUTINE')
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and variable-length IN (?, ?, ...) lists"""
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', sql)
+
+
+def is_full_scan(detail):
+    return detail.startswith('SCAN ') and not any(marker in detail for marker in NOT_FULL_SCAN)
+
+
+class QueryRecord:
+    def __init__(self, sql, elapsed):
+        self.sql = sql
+        self.elapsed = elapsed
+        self.plan = None
+        self.full_scan = False
+
+
+class RequestProfile:
+    """Counters for one request, filled in by the database and template hooks"""
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.perf_counter()
+        self.connections = 0
+        self.queries = []
+        self.render = 0.0
+        self.ollama = 0.0
+        self._render_started = []
+
+    @property
+    def db_time(self):
+        return sum(query.elapsed for query in self.queries)
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        metrics = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries, {self.connections} connections"',
+            f'render;dur={self.render * 1000:.1f}',
+        ]
+        # Generation runs on job workers, so requests rarely wait on Ollama themselves
+        if self.ollama:
+            metrics.append(f'ollama;dur={self.ollama * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that times statements and their fetches into the request profile"""
+    _query = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._query = self.connection.record(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._query = self.connection.record(sql, None, time.perf_counter() - started)
+
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._query is not None:
+                self._query.elapsed += time.perf_counter() - started
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, *([] if size is None else [size]))
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose statements and commits are recorded in a request profile"""
+    profiler = None
+    profile = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def record(self, sql, parameters, elapsed):
+        query = QueryRecord(sql, elapsed)
+        self.profile.queries.append(query)
+        if self.profiler.explain and parameters is not None:
+            query.plan, query.full_scan = self.profiler.query_plan(self, sql, parameters)
+        return query
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self.profile.queries.append(QueryRecord('COMMIT', time.perf_counter() - started))
+
+    def __exit__(self, *exc_info):
+        started = time.perf_counter()
+        try:
+            return super().__exit__(*exc_info)
+        finally:
+            self.profile.queries.append(QueryRecord('COMMIT' if exc_info[0] is None else 'ROLLBACK',
+                                                    time.perf_counter() - started))
+
+
+class RequestProfiler:
+    """Per-request SQL, template and Ollama timing for the Flask app.
+
+    Requests and AI jobs are profiled; other background work such as the
+    index sync uses plain sqlite3 connections. Each response gets a
+    Server-Timing header, each job a timing summary on /jobs/<id>, and the
+    slowest requests, jobs and statements are kept for the debug page. With
+    explain on, each distinct statement is run through EXPLAIN QUERY PLAN
+    once and full table scans are flagged.
+    """
+    def __init__(self, explain=False, keep_requests=50, max_statements=500):
+        self.explain = explain
+        self.keep_requests = keep_requests
+        self.max_statements = max_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._requests = []
+        self._statements = {}
+        self._counter = itertools.count()
+
+    def init_app(self, app, db, session=None, jobs=None):
+        """Hook into the app's requests, the database, and optionally a requests.Session and JobQueue"""
+        db.profiler = self
+        if jobs is not None:
+            jobs.around_job = self._profile_job
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        if session is not None:
+            session.hooks['response'].append(self._on_response)
+
+    @property
+    def current(self):
+        return getattr(self._local, 'profile', None)
+
+    def connect(self, db_name):
+        """A ProfiledConnection for the current request, or None outside one"""
+        profile = self.current
+        if profile is None:
+            return None
+        conn = sqlite3.connect(db_name, factory=ProfiledConnection)
+        conn.profiler = self
+        conn.profile = profile
+        profile.connections += 1
+        return conn
+
+    def query_plan(self, conn, sql, parameters):
+        key = normalize_sql(sql)
+        if key in self._plans:
+            return self._plans[key]
+        plan, full_scan = None, False
+        if key.split(' ', 1)[0].upper() in EXPLAINABLE:
+            try:
+                rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+                plan = [row[3] for row in rows]
+                full_scan = any(is_full_scan(detail) for detail in plan)
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            if len(self._plans) < self.max_statements:
+                self._plans[key] = (plan, full_scan)
+        return plan, full_scan
+
+    def _before_request(self):
+        if request.endpoint in ('static', 'profiler_report'):
+            return
+        self._local.profile = RequestProfile(request.method, request.full_path.rstrip('?'))
+
+    def _after_request(self, response):
+        profile = self.current
+        if profile is not None:
+            profile.status = response.status_code
+            response.headers['Server-Timing'] = profile.server_timing()
+        return response
+
+    def _teardown_request(self, exc):
+        profile = self.current
+        if profile is None:
+            return
+        self._local.profile = None
+        if profile.status is None:
+            profile.status = 500
+        self._store(profile, time.perf_counter() - profile.started)
+
+    def _before_render(self, sender, **extra):
+        profile = self.current
+        if profile is not None:
+            profile._render_started.append(time.perf_counter())
+
+    def _after_render(self, sender, **extra):
+        profile = self.current
+        if profile is not None and profile._render_started:
+            profile.render += time.perf_counter() - profile._render_started.pop()
+
+    def _profile_job(self, job):
+        """Run a JobQueue job under its own profile"""
+        label = ' '.join(str(part) for part in job.key[:2]) if isinstance(job.key, tuple) else str(job.key)
+        profile = RequestProfile('JOB', label)
+        self._local.profile = profile
+        try:
+            result = job.fn(*job.args)
+            profile.status = 'done'
+            return result
+        except Exception:
+            profile.status = 'failed'
+            raise
+        finally:
+            self._local.profile = None
+            entry = self._store(profile, time.perf_counter() - profile.started)
+            job.timing = {key: entry[key] for key in ('total_ms', 'db_ms', 'ollama_ms', 'queries', 'connections')}
+
+    def _on_response(self, response, *args, **kwargs):
+        profile = self.current
+        if profile is None:
+            return
+        if not kwargs.get('stream'):
+            # elapsed runs to the response headers, i.e. the whole generation
+            profile.ollama += response.elapsed.total_seconds()
+            return
+        # A streamed body is read later: count until the response is closed
+        started = time.perf_counter() - response.elapsed.total_seconds()
+        close = response.close
+
+        def timed_close():
+            if response.close is timed_close:
+                profile.ollama += time.perf_counter() - started
+                response.close = close
+            close()
+        response.close = timed_close
+
+    def _store(self, profile, total):
+        slowest = sorted(profile.queries, key=lambda query: query.elapsed, reverse=True)[:5]
+        entry = {
+            'method': profile.method,
+            'path': profile.path,
+            'status': profile.status,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(profile.db_time * 1000, 2),
+            'render_ms': round(profile.render * 1000, 2),
+            'ollama_ms': round(profile.ollama * 1000, 2),
+            'queries': len(profile.queries),
+            'connections': profile.connections,
+            'full_scans': sum(query.full_scan for query in profile.queries),
+            'slowest_queries': [{'sql': normalize_sql(query.sql), 'ms': round(query.elapsed * 1000, 3)}
+                                for query in slowest],
+            'time': time.time(),
+        }
+        with self._lock:
+            item = (total, next(self._counter), entry)
+            if len(self._requests) < self.keep_requests:
+                heapq.heappush(self._requests, item)
+            elif total > self._requests[0][0]:
+                heapq.heapreplace(self._requests, item)
+
+            for query in profile.queries:
+                key = normalize_sql(query.sql)
+                stats = self._statements.get(key)
+                if stats is None:
+                    if len(self._statements) >= self.max_statements:
+                        continue
+                    stats = self._statements[key] = {'sql': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                     'plan': None, 'full_scan': False}
+                ms = query.elapsed * 1000
+                stats['count'] += 1
+                stats['total_ms'] += ms
+                stats['max_ms'] = max(stats['max_ms'], ms)
+                if query.plan is not None:
+                    stats['plan'] = query.plan
+                    stats['full_scan'] = query.full_scan
+        return entry
+
+    def report(self, limit=50):
+        """Slowest requests and jobs, and statements by total time"""
+        with self._lock:
+            requests = [entry for _, _, entry in sorted(self._requests, reverse=True)]
+            statements = sorted((dict(stats) for stats in self._statements.values()),
+                                key=lambda stats: stats['total_ms'], reverse=True)[:limit]
+        for stats in statements:
+            stats['mean_ms'] = round(stats['total_ms'] / stats['count'], 3)
+            stats['total_ms'] = round(stats['total_ms'], 2)
+            stats['max_ms'] = round(stats['max_ms'], 3)
+        return {'explain': self.explain, 'requests': requests, 'statements': statements}
+
+    def reset(self):
+        with self._lock:
+            self._requests = []
+            self._statements = {}
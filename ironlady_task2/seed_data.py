@@ -0,0 +1,88 @@
+import argparse
+import json
+import random
+
+from bulk_import import BulkImporter
+from models import Database, DIFFICULTY_LEVELS, COMPLETION_STATUSES
+
+TOPICS = ('python data machine learning algorithms graphs network security cloud design leadership '
+          'statistics finance marketing writing biology chemistry history physics calculus databases '
+          'testing devops kubernetes frontend backend mobile ethics negotiation strategy analytics').split()
+SYLLABLES = 'ka lo mi ne ru sa ti vo ze ba de fi go hu ja'.split()
+# Topic words plus a few thousand filler words, so terms match a realistic share of rows
+WORDS = TOPICS + sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+FIRST_NAMES = 'Asha Ben Chen Divya Elena Farid Grace Hiro Ines Jamal Kira Liam Maya Noor Omar Priya'.split()
+LAST_NAMES = 'Adams Brown Costa Das Evans Fischer Gupta Hall Ito Jones Khan Lee Moreno Nair Ortiz Patel'.split()
+
+
+def phrase(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def student_rows(rng, count):
+    for i in range(count):
+        yield json.dumps({'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                          'email': f'user{i}@example.com',
+                          'phone': f'555-{rng.randrange(10000):04d}'})
+
+
+def course_rows(rng, count, sections=5):
+    for _ in range(count):
+        yield json.dumps({'title': phrase(rng, 4).title(),
+                          'description': phrase(rng, 15),
+                          'content': '\n\n'.join(phrase(rng, 60) for _ in range(sections)),
+                          'instructor': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                          'duration_hours': rng.randint(5, 80),
+                          'difficulty_level': rng.choice(DIFFICULTY_LEVELS)})
+
+
+def enrollment_rows(rng, count, student_ids, course_ids):
+    """Spread count enrollments evenly over students, distinct courses per student"""
+    per_student, extra = divmod(count, len(student_ids))
+    per_student = min(per_student, len(course_ids))
+    for i, student_id in enumerate(student_ids):
+        k = min(per_student + (1 if i < extra else 0), len(course_ids))
+        for course_id in rng.sample(course_ids, k):
+            yield json.dumps({'student_id': student_id, 'course_id': course_id,
+                              'completion_status': rng.choice(COMPLETION_STATUSES)})
+
+
+def seed(db, students=0, courses=0, enrollments=0, random_seed=42, verbose=True):
+    """Bulk load synthetic data; returns the importer reports"""
+    rng = random.Random(random_seed)
+    importer = BulkImporter(db)
+    reports = {}
+
+    if students:
+        reports['students'] = importer.import_stream('students', student_rows(rng, students), 'jsonl')
+    if courses:
+        reports['courses'] = importer.import_stream('courses', course_rows(rng, courses), 'jsonl')
+    if enrollments:
+        conn = db.get_connection()
+        student_ids = [row[0] for row in conn.execute('SELECT id FROM students')]
+        course_ids = [row[0] for row in conn.execute('SELECT id FROM courses')]
+        conn.close()
+        if student_ids and course_ids:
+            reports['enrollments'] = importer.import_stream(
+                'enrollments', enrollment_rows(rng, enrollments, student_ids, course_ids), 'jsonl')
+
+    if verbose:
+        for kind, report in reports.items():
+            print(f"{kind:<12} {report['inserted']:>9} inserted  {report['rows_per_second']:>7} rows/s")
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the database with synthetic students, courses and enrollments')
+    parser.add_argument('--db', default='course_management.db')
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--courses', type=int, default=5000)
+    parser.add_argument('--enrollments', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data sets')
+    args = parser.parse_args()
+
+    seed(Database(args.db), args.students, args.courses, args.enrollments, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Ollama endpoints used by OllamaSummarizer"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({'models': [{'name': 'codellama:latest'}]})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self._send_json({'error': 'not found'}, status=404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.server.generate_delay)
+        if payload.get('stream', True):
+            self._send_stream(payload.get('model'))
+            return
+        self._send_json({'model': payload.get('model'), 'response': self.server.response_text, 'done': True})
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model):
+        """NDJSON token stream using chunked transfer encoding, like Ollama"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for word in self.server.response_text.split(' '):
+                self._write_chunk({'model': model, 'response': word + ' ', 'done': False})
+                time.sleep(self.server.token_delay)
+            self._write_chunk({'model': model, 'response': '', 'done': True})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.cancelled_streams += 1
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + '\n').encode('utf-8')
+        self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, generate_delay=0.0, response_text='Stub summary of the course.', token_delay=0.0):
+    """Start the stub in a daemon thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubOllamaHandler)
+    server.daemon_threads = True
+    server.generate_delay = generate_delay
+    server.response_text = response_text
+    server.token_delay = token_delay
+    server.cancelled_streams = 0
+    thread = threading.Thread(target=server.serve_forever, name='stub-ollama', daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a stub Ollama server for local testing')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before each generate response')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.delay)
+    print(f'Stub Ollama listening on {base_url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
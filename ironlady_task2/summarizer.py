@@ -1,73 +1,261 @@
 import requests
+import hashlib
 import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+# Blank lines and markdown headings start a new section
+SECTION_BOUNDARY = re.compile(r'\n\s*\n|\n(?=#)')
+
+class OllamaError(Exception):
+    """Raised by the streaming methods in place of the 'Error: ...' strings"""
+    pass
+
+class GenerationError(str):
+    """'Error: ...' message returned in place of generated text.
+    
+    Still a str, so callers can display it, but is_error tells it apart from
+    a real result that happens to start with 'Error'.
+    """
+    pass
+
+OLLAMA_DOWN_MESSAGE = GenerationError("Error: Ollama server is not running. Please start Ollama with 'ollama serve' command.")
+
+def split_sections(content, max_chars):
+    """Split content at section boundaries into sections of at most max_chars.
+    
+    Sections are not packed together, so each one's hash depends only on its
+    own text; a section longer than max_chars is split further at line breaks.
+    """
+    sections = []
+    for section in SECTION_BOUNDARY.split(content):
+        section = section.strip()
+        if not section:
+            continue
+        while len(section) > max_chars:
+            cut = section.rfind('\n', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            sections.append(section[:cut].strip())
+            section = section[cut:].strip()
+        if section:
+            sections.append(section)
+    return sections
+
+def pack(texts, max_chars):
+    """Group consecutive texts so each group's joined length stays within max_chars"""
+    groups = []
+    size = 0
+    for text in texts:
+        if groups and size + len(text) + 2 <= max_chars:
+            groups[-1].append(text)
+            size += len(text) + 2
+        else:
+            groups.append([text])
+            size = len(text)
+    return groups
+
+def chunk_sections(sections, min_chars, max_chars):
+    """Join short neighbouring sections into chunks worth one section request.
+    
+    A heading always starts a new chunk. Otherwise a chunk ends once it holds
+    min_chars and its last section's hash picks it as a cut point, so the
+    boundaries follow the text itself: editing one section moves at most the
+    chunk boundaries next to it and the other chunks keep their hashes.
+    A chunk never grows past max_chars, or past 4 * min_chars.
+    """
+    chunks = []
+    chunk = []
+    size = 0
+    for section in sections:
+        if chunk and (section.startswith('#') or size + len(section) + 2 > max_chars):
+            chunks.append('\n\n'.join(chunk))
+            chunk, size = [], 0
+        chunk.append(section)
+        size += len(section) + (2 if len(chunk) > 1 else 0)
+        cut = int(hashlib.sha256(section.encode('utf-8')).hexdigest()[:8], 16) % 4 == 0
+        if size >= min_chars and (cut or size >= 4 * min_chars):
+            chunks.append('\n\n'.join(chunk))
+            chunk, size = [], 0
+    if chunk:
+        chunks.append('\n\n'.join(chunk))
+    return chunks
 
 class OllamaSummarizer:
-    def __init__(self, base_url="http://localhost:11434", model="codellama:latest"):
+    # Bump when a prompt changes so cached results built from the old one are ignored
+    SUMMARY_PROMPT_VERSION = 'v1'
+    OUTLINE_PROMPT_VERSION = 'v1'
+    SECTION_PROMPT_VERSION = 'v1'
+    
+    def __init__(self, base_url="http://localhost:11434", model="codellama:latest",
+                 pool_size=10, health_ttl=30, health_timeout=5,
+                 failure_threshold=3, retry_interval=10,
+                 chunk_chars=8000, max_in_flight=4, section_min_chars=800):
         self.base_url = base_url
         self.model = model
+        
+        # Content longer than chunk_chars is summarized section by section.
+        # Short sections are joined into chunks of about section_min_chars;
+        # a chunk still shorter than that is used as its own summary.
+        # At most max_in_flight section requests are sent to Ollama at once,
+        # across every job and stream sharing this summarizer.
+        self.chunk_chars = chunk_chars
+        self.max_in_flight = max_in_flight
+        self.section_min_chars = section_min_chars
+        self._section_slots = threading.BoundedSemaphore(max_in_flight)
+        
+        # One keep-alive connection pool shared by every request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Health status is reused for health_ttl seconds
+        self.health_ttl = health_ttl
+        self.health_timeout = health_timeout
+        self._healthy = False
+        self._checked_at = None
+        
+        # Circuit breaker: after failure_threshold consecutive connection
+        # failures, fail fast and probe every retry_interval in the background
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self._failures = 0
+        self._circuit_open = False
+        self._lock = threading.Lock()
     
-    def check_ollama_status(self):
-        """Check if Ollama is running and accessible"""
+    def _probe(self):
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=120)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.health_timeout)
             return response.status_code == 200
-        except:
+        except requests.exceptions.RequestException:
             return False
     
-    def summarize_content(self, content, max_length=200):
-        """Summarize course content using Ollama"""
-        # Check if Ollama is running
-        if not self.check_ollama_status():
-            return "Error: Ollama server is not running. Please start Ollama with 'ollama serve' command."
+    def check_ollama_status(self):
+        """Check if Ollama is running and accessible (cached for health_ttl seconds)"""
+        with self._lock:
+            if self._circuit_open:
+                return False
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.health_ttl:
+                return self._healthy
         
+        healthy = self._probe()
+        with self._lock:
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        if not healthy:
+            self._open_circuit()
+        return healthy
+    
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+    
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            should_open = self._failures >= self.failure_threshold
+        if should_open:
+            self._open_circuit()
+    
+    def _open_circuit(self):
+        with self._lock:
+            if self._circuit_open:
+                return
+            self._circuit_open = True
+            self._healthy = False
+        threading.Thread(target=self._probe_until_healthy, name='ollama-probe', daemon=True).start()
+    
+    def _probe_until_healthy(self):
+        while True:
+            time.sleep(self.retry_interval)
+            if self._probe():
+                with self._lock:
+                    self._circuit_open = False
+                    self._failures = 0
+                    self._healthy = True
+                    self._checked_at = time.monotonic()
+                return
+    
+    def _generate(self, payload, timeout=60, stream=False):
+        """POST to /api/generate on the pooled session, feeding the circuit breaker"""
         try:
-            url = f"{self.base_url}/api/generate"
-            
-            prompt = f"""
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                         timeout=timeout, stream=stream)
+        except requests.exceptions.ConnectionError:
+            # Timeouts are not counted: a slow model is not a down server
+            self._record_failure()
+            raise
+        self._record_success()
+        return response
+    
+    def _summary_payload(self, content, max_length=200, stream=False):
+        prompt = f"""
             Please provide a concise summary of the following course content in {max_length} words or less:
             
             {content}
             
             Summary:
             """
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
+        
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9
             }
+        }
+    
+    def _section_payload(self, section):
+        prompt = f"""
+            The following is one section of a longer course. Summarize its key points in 100 words or less:
             
-            response = requests.post(url, json=payload, timeout=60)
+            {section}
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('response', 'No response generated').strip()
-            else:
-                return f"Error: Ollama returned status {response.status_code}. Response: {response.text}"
-                
-        except requests.exceptions.ConnectionError:
-            return "Error: Cannot connect to Ollama. Make sure it's running on http://localhost:11434"
-        except requests.exceptions.Timeout:
-            return "Error: Request timed out. The model might be taking too long to respond."
-        except requests.exceptions.RequestException as e:
-            return f"Error: Request failed - {str(e)}"
-        except Exception as e:
-            return f"Error: Unexpected error - {str(e)}"
+            Section summary:
+            """
+        
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9
+            }
+        }
     
-    def generate_course_outline(self, title, description):
-        """Generate a course outline based on title and description"""
-        # Check if Ollama is running
-        if not self.check_ollama_status():
-            return "Error: Ollama server is not running. Please start Ollama with 'ollama serve' command."
+    def _reduce_payload(self, section_summaries, max_length=200, stream=False):
+        joined = "\n\n".join(f"Section {i}: {summary}" for i, summary in enumerate(section_summaries, start=1))
+        prompt = f"""
+            Below are summaries of consecutive sections of one course. Combine them into a single concise summary of the whole course in {max_length} words or less:
             
-        try:
-            url = f"{self.base_url}/api/generate"
+            {joined}
             
-            prompt = f"""
+            Summary:
+            """
+        
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9
+            }
+        }
+    
+    def _outline_payload(self, title, description, stream=False):
+        prompt = f"""
             Create a detailed course outline for the following course:
             
             Title: {title}
@@ -81,23 +269,223 @@ class OllamaSummarizer:
             
             Course Outline:
             """
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.5
-                }
+        
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.5
             }
+        }
+    
+    def summarize_content(self, content, max_length=200):
+        """Summarize course content using Ollama"""
+        # Check if Ollama is running
+        if not self.check_ollama_status():
+            return OLLAMA_DOWN_MESSAGE
+        
+        return self._complete(self._summary_payload(content, max_length))
+    
+    def _complete(self, payload):
+        """Run a non-streaming generation, returning the text or a GenerationError"""
+        try:
+            response = self._generate(payload)
             
-            response = requests.post(url, json=payload, timeout=60)
+            if response.status_code == 200:
+                result = response.json()
+                return result.get('response', 'No response generated').strip()
+            else:
+                return GenerationError(f"Error: Ollama returned status {response.status_code}. Response: {response.text}")
+                
+        except requests.exceptions.ConnectionError:
+            return GenerationError(f"Error: Cannot connect to Ollama. Make sure it's running on {self.base_url}")
+        except requests.exceptions.Timeout:
+            return GenerationError("Error: Request timed out. The model might be taking too long to respond.")
+        except requests.exceptions.RequestException as e:
+            return GenerationError(f"Error: Request failed - {str(e)}")
+        except Exception as e:
+            return GenerationError(f"Error: Unexpected error - {str(e)}")
+    
+    @staticmethod
+    def section_hash(section):
+        return hashlib.sha256(section.encode('utf-8')).hexdigest()
+    
+    def _summarize_section(self, section):
+        with self._section_slots:
+            return self._complete(self._section_payload(section))
+    
+    def _condense(self, summaries, partials, used):
+        """Merge section summaries in groups until they fit in one reduce prompt.
+        
+        Merged groups are cached in partials under the hash of their input,
+        so a group with unchanged summaries is not sent to Ollama again.
+        """
+        limit = self.chunk_chars
+        while sum(len(summary) + 2 for summary in summaries) > limit:
+            if len(summaries) == 1:
+                return [summaries[0][:limit]], None
+            groups = pack(summaries, limit)
+            if len(groups) == len(summaries):
+                # No two summaries fit together: cut them so they pair up
+                summaries = [summary[:limit // 2 - 2] for summary in summaries]
+                continue
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                merged = list(pool.map(lambda group: self._merge_group(group, partials, used), groups))
+            for summary in merged:
+                if self.is_error(summary):
+                    return None, summary
+            summaries = merged
+        return summaries, None
+    
+    def _merge_group(self, group, partials, used):
+        if len(group) == 1:
+            return group[0]
+        h = self.section_hash('merge\0' + '\0'.join(group))
+        used.add(h)
+        if h not in partials:
+            with self._section_slots:
+                summary = self._complete(self._reduce_payload(group))
+            if self.is_error(summary):
+                return summary
+            partials[h] = summary
+        return partials[h]
+    
+    def _map_sections(self, sections, partials):
+        """Return (section summaries, error) for sections, in order.
+        
+        Sections are first joined into chunks (see chunk_sections). partials
+        maps input hash -> summary for chunks and merged groups; it is updated
+        in place and pruned to what this content used. Only chunks and groups
+        missing from it are sent to Ollama, so editing one section
+        re-summarizes only its chunk and the merges above it.
+        """
+        chunks = chunk_sections(sections, self.section_min_chars, self.chunk_chars)
+        hashes = [self.section_hash(chunk) for chunk in chunks]
+        todo = {h: chunk for h, chunk in zip(hashes, chunks)
+                if h not in partials and len(chunk) >= self.section_min_chars}
+        
+        if todo:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                results = pool.map(self._summarize_section, todo.values())
+                for h, summary in zip(todo, results):
+                    if self.is_error(summary):
+                        return None, summary
+                    partials[h] = summary
+        
+        used = set(hashes)
+        summaries = [partials.get(h, chunk) for h, chunk in zip(hashes, chunks)]
+        summaries, error = self._condense(summaries, partials, used)
+        if error:
+            return None, error
+        for h in set(partials) - used:
+            del partials[h]
+        return summaries, None
+    
+    def summarize_long_content(self, content, max_length=200, partials=None):
+        """Map-reduce summary for content too long for a single prompt.
+        
+        Sections are summarized concurrently, then merged in a final reduce
+        step. Pass a partials dict (see _map_sections) to reuse section
+        summaries. Short content falls through to summarize_content.
+        """
+        if len(content) <= self.chunk_chars:
+            return self.summarize_content(content, max_length)
+        
+        if not self.check_ollama_status():
+            return OLLAMA_DOWN_MESSAGE
+        
+        partials = {} if partials is None else partials
+        section_summaries, error = self._map_sections(split_sections(content, self.chunk_chars), partials)
+        if error:
+            return error
+        return self._complete(self._reduce_payload(section_summaries, max_length))
+    
+    def generate_course_outline(self, title, description):
+        """Generate a course outline based on title and description"""
+        # Check if Ollama is running
+        if not self.check_ollama_status():
+            return OLLAMA_DOWN_MESSAGE
+            
+        try:
+            payload = self._outline_payload(title, description)
+            response = self._generate(payload)
             
             if response.status_code == 200:
                 result = response.json()
                 return result.get('response', 'No outline generated').strip()
             else:
-                return f"Error: Ollama returned status {response.status_code}"
+                return GenerationError(f"Error: Ollama returned status {response.status_code}")
                 
         except Exception as e:
-            return f"Error: {str(e)}"
+            return GenerationError(f"Error: {str(e)}")
+    
+    def stream_summary(self, content, max_length=200, partials=None):
+        """Yield summary tokens as Ollama produces them.
+        
+        Long content is mapped section by section first (not streamed) and
+        only the reduce step is streamed.
+        """
+        if len(content) <= self.chunk_chars:
+            yield from self._stream(self._summary_payload(content, max_length, stream=True), 'summary')
+            return
+        
+        if not self.check_ollama_status():
+            raise OllamaError(OLLAMA_DOWN_MESSAGE)
+        
+        partials = {} if partials is None else partials
+        section_summaries, error = self._map_sections(split_sections(content, self.chunk_chars), partials)
+        if error:
+            raise OllamaError(error)
+        
+        yield from self._stream(self._reduce_payload(section_summaries, max_length, stream=True), 'summary')
+    
+    def stream_course_outline(self, title, description):
+        """Yield outline tokens as Ollama produces them"""
+        return self._stream(self._outline_payload(title, description, stream=True), 'outline')
+    
+    def _stream(self, payload, label):
+        """Read Ollama's NDJSON stream line by line, yielding each token.
+        
+        Closing the generator (e.g. when the browser disconnects) closes the
+        upstream response, which stops generation on the Ollama side.
+        """
+        if not self.check_ollama_status():
+            raise OllamaError(OLLAMA_DOWN_MESSAGE)
+        
+        started = time.perf_counter()
+        try:
+            response = self._generate(payload, stream=True)
+        except requests.exceptions.ConnectionError:
+            raise OllamaError(f"Error: Cannot connect to Ollama. Make sure it's running on {self.base_url}")
+        except requests.exceptions.RequestException as e:
+            raise OllamaError(f"Error: Request failed - {str(e)}")
+        
+        try:
+            if response.status_code != 200:
+                raise OllamaError(f"Error: Ollama returned status {response.status_code}")
+            
+            first_token = True
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise OllamaError(f"Error: {chunk['error']}")
+                token = chunk.get('response', '')
+                if token:
+                    if first_token:
+                        logger.info('%s first token after %.0f ms', label, (time.perf_counter() - started) * 1000)
+                        first_token = False
+                    yield token
+                if chunk.get('done'):
+                    break
+        except requests.exceptions.RequestException as e:
+            raise OllamaError(f"Error: Stream interrupted - {str(e)}")
+        finally:
+            response.close()
+    
+    @staticmethod
+    def is_error(text):
+        """True for the GenerationError messages returned instead of generated text"""
+        return isinstance(text, GenerationError)